@@ -1,10 +1,9 @@
 # indabax_app/context_processors.py
-from .models import SiteSettings
+from django.utils.functional import SimpleLazyObject
+from kuai_club.context_processors import request_site_chrome
 
 def indabax_settings(request): # <--- RENAMED THE FUNCTION
-    try:
-        # Attempt to get the first (and presumably only) SiteSettings object
-        settings = SiteSettings.objects.first()
-    except SiteSettings.DoesNotExist:
-        settings = None
-    return {'indabax_settings': settings} # <--- RENAMED THE DICTIONARY KEY
\ No newline at end of file
+    # The IndabaX SiteSettings row is part of the cached kuai_club site
+    # chrome bundle, which settings.TEMPLATES registers instead of this.
+    settings = SimpleLazyObject(lambda: request_site_chrome(request)['indabax_settings'])
+    return {'indabax_settings': settings} # <--- RENAMED THE DICTIONARY KEY
@@ -2,6 +2,8 @@ from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 
+from kuai_club.images import ImageSpec
+
 
 class SiteSettings(models.Model):
     # Social Media Links
@@ -57,6 +59,9 @@ class HomePageContent(models.Model):
     cta_secondary_button_text = models.CharField(max_length=50, default="Contact Us")
     cta_secondary_button_url = models.URLField(blank=True, null=True, help_text="URL for the secondary Call to Action button (e.g., Contact page).")
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'about_home_image': ImageSpec((800, 600))}
+
     def __str__(self):
         return "Home Page General Content"
 
@@ -92,6 +97,9 @@ class Event(models.Model):
     registration_url = models.URLField(blank=True, null=True, help_text="Google Form URL or similar registration link")
     image = models.ImageField(upload_to='events/', blank=True, null=True)
     is_upcoming = models.BooleanField(default=True, help_text="Check if this is an upcoming event.")
+
+    # Responsive variants made by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec()}
     
     def __str__(self):
         return self.title
@@ -108,6 +116,9 @@ class Partner(models.Model):
     website_url = models.URLField(blank=True, null=True)
     order = models.PositiveIntegerField(default=0, help_text="Order in which partners are displayed.")
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'logo': ImageSpec((400, 200))}
+
     class Meta:
         ordering = ['order']
 
@@ -121,6 +132,9 @@ class EventImage(models.Model):
     description = models.TextField(blank=True)
     date_uploaded = models.DateTimeField(auto_now_add=True)
 
+    # Responsive variants made by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec()}
+
     def __str__(self):
         return self.title
     
@@ -176,7 +190,9 @@ class Leader(models.Model):
     linkedin_url = models.URLField(max_length=200, blank=True)
     twitter_url = models.URLField(max_length=200, blank=True)
     github_url = models.URLField(max_length=200, blank=True)
-    
+
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'photo': ImageSpec((800, 600), quality=85)}
 
     def __str__(self):
         return f"{self.name} ({self.position})"
@@ -242,6 +258,9 @@ class GalleryImage(models.Model):
     description = models.TextField(blank=True, help_text="Brief description for the hero image (optional).")
     order = models.IntegerField(default=0, help_text="Order in which images appear in the slider.")
 
+    # Responsive variants made by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec()}
+
     class Meta:
         ordering = ['order']
         verbose_name = "Hero Gallery Image"
@@ -257,6 +276,9 @@ class HeroBackgroundImage(models.Model):
     order = models.IntegerField(default=0, help_text="Order in which images should appear in the rotation.")
     is_active = models.BooleanField(default=True, help_text="Only active images will be used in the rotation.")
 
+    # Responsive variants made by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec()}
+
     def __str__(self):
         return self.title if self.title else f"Hero Background Image {self.id}"
 
@@ -337,6 +359,9 @@ class SessionImage(models.Model):
     caption = models.CharField(max_length=255, blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Responsive variants made by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec()}
+
     class Meta:
         ordering = ['-uploaded_at']
 
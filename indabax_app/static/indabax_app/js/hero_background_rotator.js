@@ -5,8 +5,23 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Get URLs from data attribute
     let backgroundImages = JSON.parse(heroBannerContainer.dataset.backgroundUrls || '[]');
+    const backgroundSrcsets = JSON.parse(heroBannerContainer.dataset.backgroundSrcsets || '[]');
+    const backgroundPlaceholders = JSON.parse(heroBannerContainer.dataset.backgroundPlaceholders || '[]');
     const defaultBackground = heroBannerContainer.dataset.defaultBackground;
 
+    // Swap each URL for the narrowest variant at least as wide as the banner
+    // on this screen ("url 320w, url 640w, ..."), or the widest one there is
+    const neededWidth = heroBannerContainer.clientWidth * (window.devicePixelRatio || 1);
+    backgroundImages = backgroundImages.map(function(url, index) {
+        const candidates = (backgroundSrcsets[index] || '').split(', ').filter(Boolean).map(function(candidate) {
+            const parts = candidate.split(' ');
+            return { url: parts[0], width: parseInt(parts[1], 10) };
+        });
+        if (candidates.length === 0) return url;
+        const fitting = candidates.find(function(candidate) { return candidate.width >= neededWidth; });
+        return (fitting || candidates[candidates.length - 1]).url;
+    });
+
     // Fallback if no images are set in the admin
     if (backgroundImages.length === 0 && defaultBackground) {
         backgroundImages.push(defaultBackground);
@@ -15,7 +30,11 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentImageIndex = 0;
 
     function changeBackground() {
-        heroBannerContainer.style.backgroundImage = `url('${backgroundImages[currentImageIndex]}')`;
+        // The blurred placeholder underneath shows until the image has loaded
+        const placeholder = backgroundPlaceholders[currentImageIndex];
+        heroBannerContainer.style.backgroundImage = placeholder
+            ? `url('${backgroundImages[currentImageIndex]}'), url('${placeholder}')`
+            : `url('${backgroundImages[currentImageIndex]}')`;
         currentImageIndex = (currentImageIndex + 1) % backgroundImages.length;
     }
 
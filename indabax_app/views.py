@@ -21,9 +21,13 @@ from django.db.models import Q
 import json
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView
+from django.utils.decorators import method_decorator
+from kuai_club.media import field_spec, get_media_info, srcset
+from kuai_club.page_cache import cache_anonymous_page
 
 
 
+@method_decorator(cache_anonymous_page, name='dispatch')
 class HomePageView(TemplateView):
     template_name = 'indabax_app/home.html'
     
@@ -40,9 +44,19 @@ class HomePageView(TemplateView):
         hero_background_images = HeroBackgroundImage.objects.filter(is_active=True).order_by('order')
         context['hero_background_images'] = hero_background_images
 
-        # Prepare a JSON list of URLs for JavaScript
+        # Prepare a JSON list of URLs for JavaScript, plus the srcset of each
+        # image so the rotator can pick the variant that fits the screen and
+        # its placeholder to show while that variant loads
         background_urls = [img.image.url for img in hero_background_images]
+        media_info = get_media_info()
+        background_infos = [media_info.get(img.image.url, field_spec(img.image)) for img in hero_background_images]
+        background_srcsets = [srcset(info.variants) if info else '' for info in background_infos]
+        background_placeholders = [info.placeholder if info else '' for info in background_infos]
         context['hero_background_urls_json'] = json.dumps(background_urls)
+        context['hero_background_srcsets_json'] = json.dumps(background_srcsets)
+        context['hero_background_placeholders_json'] = json.dumps(background_placeholders)
+        # Inlined so the banner isn't blank until the script has run
+        context['hero_background_placeholder'] = background_placeholders[0] if background_placeholders else ''
 
         # For the Core Pillars section
         context['pillars'] = Pillar.objects.all()
@@ -53,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'kuai_club.middleware.SiteDataMiddleware',
 ]
 
 ROOT_URLCONF = 'indabax_kabale.urls'
@@ -68,24 +69,11 @@ TEMPLATES = [
                 'django.template.context_processors.tz', 
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                #processors for indabax_app
-                'indabax_app.context_processors.indabax_settings',
-
-
-
-
-                'kuai_club.context_processors.site_settings',
-                'kuai_club.context_processors.about_pages_processor',
+                # Layout data for both apps (including indabax_settings),
+                # served from one cached bundle
+                'kuai_club.context_processors.site_chrome',
                 'kuai_club.context_processors.leader_processor',
-                'kuai_club.context_processors.news_processor',
-                'kuai_club.context_processors.events_processor',
-                'kuai_club.context_processors.research_processor',
-                'kuai_club.context_processors.resource_processor',
-                'kuai_club.context_processors.community_processor',
-                'kuai_club.context_processors.project_processor',
-                'kuai_club.context_processors.partner_processor',
-                'kuai_club.context_processors.hero_processor',
-                'kuai_club.context_processors.gallery_processor',
+                'kuai_club.context_processors.page_cache_csrf',
             ],
         },
     },
@@ -135,10 +123,86 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Cache
+# Each worker keeps a small in-process LRU (kuai_club.cache_backends) in
+# front of a file-based cache shared by all workers, so invalidation done by
+# one worker is seen by the others within L1_TIMEOUT seconds. Point
+# KUAI_CACHE_DIR elsewhere to keep several checkouts or a staging copy from
+# sharing (and clearing) each other's entries.
+
+CACHE_DIR = Path(os.environ.get('KUAI_CACHE_DIR', BASE_DIR / '.cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'kuai_club.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 500,
+            'L1_TIMEOUT': 5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+# Lock files of the single-flight recomputation in kuai_club.cache_backends,
+# one per cache key being rebuilt. Workers sharing CACHE_DIR share these.
+CACHE_LOCK_DIR = CACHE_DIR / 'locks'
+
+# Full-page cache for anonymous visitors (kuai_club.page_cache). Pages are
+# keyed by the content version; pages with time-based sections such as
+# "upcoming events" are cached only until the next event starts or ends.
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Clock-dependent listings (kuai_club.listings) stay fresh until the next
+# event start/end or leader term change; after that the old list is still
+# served for up to this long while it is rebuilt in the background.
+LISTING_STALE_TIMEOUT = 60 * 10
+
+# Layout fragments (navbar, footer, gallery) and the sections of /api/home/
+# are keyed on the versions of the models they show; the timeout only
+# reclaims entries for old versions.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# How long browsers and shared caches may reuse /api/events/ and
+# /api/projects/ responses before revalidating them with their ETag
+# (kuai_club.conditional). Upcoming events are capped at the minute.
+API_CACHE_MAX_AGE = 60
+
 #media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content, named by their SHA-256
+# (kuai_club.storage); `manage.py dedupe_media` moves older uploads there.
+STORAGES = {
+    'default': {'BACKEND': 'kuai_club.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Uploaded images are resized by `manage.py process_images` (kuai_club.image_jobs).
+# A failed job is retried with exponential backoff up to this many times;
+# a job left running longer than the timeout (seconds) is taken over.
+IMAGE_JOB_MAX_ATTEMPTS = 5
+IMAGE_JOB_TIMEOUT = 60 * 10
+
+# Widths of the responsive variants made for each upload (srcset candidates)
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024, 1920)
+
+# Alternate encodings stored next to every JPEG/PNG the site shows, best
+# first; the media view serves them to browsers that accept them. Formats
+# this Pillow build can't write are skipped.
+IMAGE_ALTERNATE_FORMATS = ('AVIF', 'WEBP')
+
+# Most pixels the worker decodes from one upload. Larger JPEGs are decoded
+# at 1/2, 1/4 or 1/8 scale to fit; other formats fail their job.
+IMAGE_MAX_PIXELS = 25_000_000
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -18,7 +18,9 @@ Including another URLconf
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from kuai_club.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,6 +30,13 @@ urlpatterns = [
 ]
 
 
+# Uploaded files go through serve_media, which picks the AVIF/WebP encoding
+# of an image when the browser accepts it. Set SERVE_MEDIA to keep it when
+# DEBUG is off; otherwise the web server has to do the same negotiation.
+if settings.DEBUG or getattr(settings, 'SERVE_MEDIA', False):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+    ]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
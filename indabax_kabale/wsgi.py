@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'indabax_kabale.settings')
 
 application = get_wsgi_application()
+
+# Post-deploy hook: set KUAI_PREWARM_CACHE=1 to fill the caches in the
+# background as soon as a worker starts (see kuai_club/warmup.py).
+if os.environ.get('KUAI_PREWARM_CACHE'):
+    from kuai_club.warmup import warm_in_background
+    warm_in_background()
@@ -291,3 +291,30 @@ class ContactInfoAdmin(admin.ModelAdmin):
 
 
 
+
+
+from .models import ImageJob, MediaAsset
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'source', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'content_type')
+    search_fields = ('source', 'last_error')
+    readonly_fields = ('content_type', 'object_id', 'field_name', 'source', 'attempts', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs')
+    def retry_jobs(self, request, queryset):
+        from django.utils.timezone import now
+        count = queryset.exclude(status=ImageJob.RUNNING).update(
+            status=ImageJob.PENDING, attempts=0, last_error='', run_after=now()
+        )
+        self.message_user(request, f"{count} job(s) queued again.")
+
+
+@admin.register(MediaAsset)
+class MediaAssetAdmin(admin.ModelAdmin):
+    list_display = ('source', 'derivative', 'updated_at')
+    search_fields = ('source', 'derivative')
+    readonly_fields = ('created_at', 'updated_at')
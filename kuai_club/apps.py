@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KuaiClubConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kuai_club'
+
+    def ready(self):
+        # Connect the cache invalidation receivers
+        from . import signals  # noqa: F401
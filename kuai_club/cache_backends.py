@@ -0,0 +1,326 @@
+"""
+Two-tier cache backend and single-flight recomputation.
+
+TwoTierCache keeps a small, bounded LRU of recently used entries inside
+each worker process (tier 1) in front of a shared cache that every worker
+sees (tier 2, another CACHES alias; on-disk by default). Reads are served
+from tier 1 when possible; writes, deletes and counters always go through
+to tier 2. Tier 1 entries live at most ``L1_TIMEOUT`` seconds, which bounds
+how long a worker can keep serving a value another worker has changed.
+
+Configure it with the alias of the shared tier as LOCATION::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'kuai_club.cache_backends.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'L1_MAX_ENTRIES': 500, 'L1_TIMEOUT': 5},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / '.cache',
+        },
+    }
+
+get_or_compute() adds stale-while-revalidate with single-flight locking on
+top of any backend: when an entry expires, one worker recomputes it while
+the others keep serving the stale value. get_or_compute_until() does the
+same for values that carry their own expiry time, and can refresh them in
+a background thread. The lock is a file in CACHE_LOCK_DIR created with
+O_CREAT | O_EXCL, which exactly one process can do; cache.add() is not
+atomic on the file-based cache.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connection
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = server
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 500))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # --- Tier 1 ---
+
+    def _l1_get(self, key, version):
+        key = self.make_and_validate_key(key, version=version)
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(data)
+
+    def _l1_set(self, key, value, timeout, version):
+        key = self.make_and_validate_key(key, version=version)
+        ttl = self._l1_timeout if timeout is None else min(timeout, self._l1_timeout)
+        with self._l1_lock:
+            if ttl <= 0:
+                self._l1.pop(key, None)
+                return
+            # Pickled like LocMemCache, so callers can't mutate the cached copy
+            self._l1[key] = (time.monotonic() + ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key, version):
+        key = self.make_and_validate_key(key, version=version)
+        with self._l1_lock:
+            self._l1.pop(key, None)
+
+    def clear_local(self):
+        """Drop this process's tier 1 entries only."""
+        with self._l1_lock:
+            self._l1.clear()
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # --- Cache API ---
+
+    def get(self, key, default=None, version=None):
+        value = self._l1_get(key, version)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._l1_set(key, value, None, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self._l1_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(key, version)
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._l1_get(key, version) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        return self.shared.decr(key, delta, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._l1_get(key, version)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        if remaining:
+            shared_values = self.shared.get_many(remaining, version=version)
+            for key, value in shared_values.items():
+                self._l1_set(key, value, None, version)
+            found.update(shared_values)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(key, value, timeout, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.clear_local()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+# --- Stale-while-revalidate ---
+
+_Entry = namedtuple('_Entry', 'value fresh_until')
+
+
+def _store(cache, key, value, fresh_until, stale_timeout):
+    if fresh_until is None:
+        cache.set(key, _Entry(value, None), None)
+    else:
+        ttl = max(fresh_until - time.time(), 0)
+        cache.set(key, _Entry(value, fresh_until), ttl + stale_timeout)
+
+
+def _is_fresh(entry):
+    return entry.fresh_until is None or time.time() < entry.fresh_until
+
+
+def _lock_path(key):
+    name = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(settings.CACHE_LOCK_DIR, f'{name}.lock')
+
+
+def acquire_lock(key, timeout):
+    """
+    Take the lock on ``key`` unless another worker holds it. A lock older
+    than ``timeout`` seconds was left behind by a worker that died and is
+    taken over.
+    """
+    path = _lock_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(path) < timeout:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            # Released in the meantime
+            pass
+    return False
+
+
+def release_lock(key):
+    try:
+        os.remove(_lock_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def _refresh(cache, key, compute, stale_timeout, lock_key):
+    try:
+        value, fresh_until = compute()
+        _store(cache, key, value, fresh_until, stale_timeout)
+        return _Entry(value, fresh_until)
+    finally:
+        release_lock(lock_key)
+
+
+def _refresh_in_background(cache, key, compute, stale_timeout, lock_key):
+    def run():
+        try:
+            _refresh(cache, key, compute, stale_timeout, lock_key)
+        except Exception:
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            # The thread has its own DB connection
+            connection.close()
+
+    threading.Thread(target=run, name=f'refresh:{key}', daemon=True).start()
+
+
+def get_or_compute_until(key, compute, stale_timeout=300, lock_timeout=30, cache=None, background=False,
+                         wait_timeout=1):
+    """
+    Like get_or_compute(), for values that know when they go stale.
+
+    ``compute()`` returns ``(value, fresh_until)``, where ``fresh_until`` is
+    a Unix timestamp or None for "until deleted". Returns an ``_Entry`` so
+    callers can see how long the value they got stays fresh. With
+    ``background=True`` a stale value is refreshed in a separate thread and
+    even the worker that took the lock answers with the stale value.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry):
+        return entry
+
+    lock_key = f'{key}:lock'
+    if acquire_lock(lock_key, lock_timeout):
+        if entry is not None and background:
+            _refresh_in_background(cache, key, compute, stale_timeout, lock_key)
+            return entry
+        return _refresh(cache, key, compute, stale_timeout, lock_key)
+
+    if entry is not None:
+        return entry
+
+    # Nothing to serve yet: give the lock holder a moment, then compute the
+    # value here rather than keep the request waiting on a slow rebuild
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    value, fresh_until = compute()
+    _store(cache, key, value, fresh_until, stale_timeout)
+    return _Entry(value, fresh_until)
+
+
+def store(key, value, timeout=None, stale_timeout=300, cache=None):
+    """Put ``value`` where get_or_compute() finds it, over any current entry."""
+    fresh_until = None if timeout is None else time.time() + timeout
+    _store(cache or default_cache, key, value, fresh_until, stale_timeout)
+
+
+def get_or_compute(key, compute, timeout=None, stale_timeout=300, lock_timeout=30, cache=None, wait_timeout=1):
+    """
+    Return the cached value for ``key``, computing it with ``compute()`` when needed.
+
+    The value counts as fresh for ``timeout`` seconds (forever if None) and
+    is kept ``stale_timeout`` seconds longer. Once it is stale, the first
+    worker to take the lock recomputes it and the others get the stale
+    value. On a cold miss the others wait up to ``wait_timeout`` seconds
+    for that worker rather than all hitting the database together, then
+    compute it themselves. A lock is broken after ``lock_timeout`` seconds.
+    """
+    def compute_with_expiry():
+        return compute(), None if timeout is None else time.time() + timeout
+
+    return get_or_compute_until(
+        key, compute_with_expiry, stale_timeout, lock_timeout, cache, wait_timeout=wait_timeout,
+    ).value
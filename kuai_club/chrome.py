@@ -0,0 +1,101 @@
+"""
+The "site chrome": every piece of layout data shared by all pages.
+
+Settings, about pages, navbar lists, hero slides, gallery, partners and
+contact info are built in one pass and cached under a single key without a
+timeout; kuai_club.signals drops the key whenever one of the underlying
+rows is saved or deleted. Every value is a compact record from
+kuai_club.records, or a list of them, never a QuerySet or model instance,
+so a cache hit unpickles a few short tuples holding only the columns the
+layout renders.
+"""
+from indabax_app.models import SiteSettings as IndabaxSiteSettings
+from .cache_backends import get_or_compute, store
+from .models import (
+    SiteSettings,
+    Aboutus,
+    News,
+    Event,
+    Research,
+    Resource,
+    CommunityOutreach,
+    Project,
+    HeroSlide,
+    GalleryImage,
+    Partner,
+    ContactInfo,
+)
+from .records import (
+    materialize,
+    materialize_first,
+    news_links,
+    SiteSettingsRecord,
+    IndabaxSettingsRecord,
+    AboutRecord,
+    ContactRecord,
+    EventLink,
+    ResearchLink,
+    ResourceLink,
+    CommunityLink,
+    ProjectLink,
+    HeroSlideRecord,
+    GalleryItem,
+    PartnerRecord,
+)
+
+# Bump the suffix whenever the shape of the bundle changes so that workers
+# running the new code never unpickle a bundle built by the old one.
+SITE_CHROME_KEY = 'site_chrome:v3'
+
+# Context variables provided by the bundle
+SITE_CHROME_VARIABLES = (
+    'site_settings',
+    'indabax_settings',
+    'about_pages',
+    'about_page',
+    'news',
+    'events',
+    'research',
+    'resources',
+    'community',
+    'projects',
+    'hero_slides',
+    'gallery_images',
+    'partners',
+    'contact_info',
+)
+
+
+def build_site_chrome():
+    """Query every layout variable shared by all pages."""
+    about_pages = materialize(Aboutus.objects.order_by('pk'), AboutRecord)
+    return {
+        'site_settings': materialize_first(SiteSettings.objects.order_by('pk'), SiteSettingsRecord),
+        'indabax_settings': materialize_first(IndabaxSiteSettings.objects.order_by('pk'), IndabaxSettingsRecord),
+        'about_pages': about_pages,
+        'about_page': about_pages[0] if about_pages else None,
+        'news': news_links(News.objects.filter(is_published=True).order_by('-publish_date')),
+        'events': materialize(Event.objects.filter(is_published=True).order_by('event_start'), EventLink),
+        'research': materialize(Research.objects.order_by('title'), ResearchLink),
+        'resources': materialize(Resource.objects.filter(is_active=True).order_by('title'), ResourceLink),
+        'community': materialize(CommunityOutreach.objects.order_by('title'), CommunityLink),
+        'projects': materialize(Project.objects.filter(is_published=True).order_by('title'), ProjectLink),
+        # Only active slides, ordered, limited to 5
+        'hero_slides': materialize(HeroSlide.objects.filter(is_active=True).order_by('order')[:5], HeroSlideRecord),
+        'gallery_images': materialize(GalleryImage.objects.order_by('-upload_date', '-id')[:10], GalleryItem),
+        'partners': materialize(Partner.objects.filter(is_active=True).order_by('name'), PartnerRecord),
+        'contact_info': materialize_first(ContactInfo.objects.order_by('pk'), ContactRecord),
+    }
+
+
+def get_site_chrome():
+    """Return the cached layout bundle, building it on a miss."""
+    # Single-flight: after an invalidation one worker rebuilds the bundle
+    # while the others wait for it instead of all querying at once.
+    return get_or_compute(SITE_CHROME_KEY, build_site_chrome)
+
+
+def rebuild_site_chrome():
+    """Build the layout bundle and store it over the cached one."""
+    # Requests keep getting the old bundle until the new one replaces it
+    store(SITE_CHROME_KEY, build_site_chrome())
@@ -0,0 +1,68 @@
+"""
+Conditional GET for the JSON APIs.
+
+A view wrapped with ``conditional_api(validator)`` first asks the validator
+(called with the view's arguments) for a Validator: an ETag built from cheap facts about the rows behind the
+response (their latest updated_at and their count), the Last-Modified time
+and how long browsers and shared caches may reuse the response. A request
+whose If-None-Match or If-Modified-Since still matches gets a 304 without
+the view running; other responses are sent with those headers attached.
+
+The model version (kuai_club.versioning) is part of every ETag because
+queryset.update(), used when a resized image replaces an upload, leaves
+updated_at alone. If-None-Match wins over If-Modified-Since, so only a
+client sending the date alone can miss a deleted row that was not the
+latest.
+"""
+import hashlib
+from collections import namedtuple
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# etag: unquoted tag; last_modified: aware datetime or None; max_age: seconds
+Validator = namedtuple('Validator', 'etag last_modified max_age')
+
+
+def make_etag(*parts):
+    """A short tag changing whenever any of ``parts`` does."""
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def _add_validators(response, validator):
+    response['ETag'] = quote_etag(validator.etag)
+    if validator.last_modified is not None:
+        response['Last-Modified'] = http_date(validator.last_modified.timestamp())
+    patch_cache_control(response, public=True, max_age=max(0, int(validator.max_age)))
+    return response
+
+
+def conditional_api(validator_func):
+    """Answer GET/HEAD requests to the view with 304 while ``validator_func(request, ...)`` matches."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            validator = validator_func(request, *args, **kwargs)
+            last_modified = validator.last_modified
+            response = get_conditional_response(
+                request,
+                etag=quote_etag(validator.etag),
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+            )
+            if response is not None:
+                # 304, or 412 for a failed If-Match
+                return _add_validators(response, validator) if response.status_code == 304 else response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                _add_validators(response, validator)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,342 @@
+"""
+Read-only JSON API over the public models of both apps.
+
+``/api/content/<resource>/`` lists the visible rows of one ContentResource
+in a fixed order, paged by cursor (kuai_club.pagination) like the projects
+and events APIs. Query parameters:
+
+- ``fields=title,image_url``: send only these keys (``id`` always comes)
+- ``include=speakers,images``: embed related rows, one query per relation
+  whatever the page size
+- ``id=1,2`` and the resource's own filters, e.g. ``category=3``. Only
+  indexed columns can be filters; that is checked when this module loads
+- ``cursor`` ('' or the last ``next_cursor``) and ``per_page`` (up to 100)
+
+``/api/content/`` describes every resource. Payloads are built from
+values() rows by each resource's ValuesSerializer (kuai_club.serializers).
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import models
+from django.db.models import F
+
+from indabax_app import models as indabax
+from . import models as kuai
+from .pagination import keyset_page
+from .serializers import Column, DateTime, Media, Text, ValuesSerializer
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# Query parameters that aren't filters
+RESERVED_PARAMS = {'fields', 'include', 'cursor', 'per_page'}
+
+# Key under which include queries return the id of the row they belong to
+PARENT_KEY = 'content_api_parent'
+
+
+class ContentQueryError(ValueError):
+    pass
+
+
+def _cursor_type(field):
+    for field_class, type_ in (
+        (models.DateTimeField, datetime),
+        (models.DateField, date),
+        (models.BooleanField, bool),
+        (models.CharField, str),
+    ):
+        if isinstance(field, field_class):
+            return type_
+    return int
+
+
+def _is_indexed(model, field):
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    return any(index.fields and index.fields[0].lstrip('-') == field.name for index in model._meta.indexes)
+
+
+def _reverse_path(field):
+    """The lookup from the related model back to the model holding ``field``."""
+    if field.auto_created and not field.concrete:  # reverse FK, e.g. Session.images
+        return field.field.name
+    return field.related_query_name()
+
+
+class ContentResource:
+    """
+    One model exposed by the API: its payload ``fields`` (as for
+    ValuesSerializer), the rows shown (``visible`` filter kwargs), an
+    ``ordering`` ending in a unique column, ``filters`` (indexed field
+    names) and ``includes`` (key -> (resource name, relation name)).
+    """
+
+    def __init__(self, name, model, fields, ordering, visible=None, filters=(), includes=None):
+        self.name = name
+        self.model = model
+        self.serializer = ValuesSerializer(model, **fields)
+        self.ordering = list(ordering)
+        self.cursor_types = tuple(_cursor_type(model._meta.get_field(field.lstrip('-'))) for field in self.ordering)
+        self.visible = visible or {}
+        self.includes = includes or {}
+        self.filters = {}
+        for name in ('id', *filters):
+            field = model._meta.pk if name == 'id' else model._meta.get_field(name)
+            if not _is_indexed(model, field):
+                raise ImproperlyConfigured(f'{model._meta.label}.{field.name} is not indexed and cannot be a filter')
+            self.filters[name] = field
+
+    def queryset(self):
+        return self.model._default_manager.filter(**self.visible)
+
+    def describe(self):
+        return {
+            'fields': list(self.serializer.fields),
+            'filters': list(self.filters),
+            'includes': list(self.includes),
+            'ordering': self.ordering,
+        }
+
+    def _selected(self, param, choices, what):
+        keys = [key for key in (param or '').split(',') if key]
+        unknown = [key for key in keys if key not in choices]
+        if unknown:
+            raise ContentQueryError(f"Unknown {what} for {self.name}: {', '.join(unknown)}")
+        return keys
+
+    def _filter(self, queryset, params):
+        for name, value in params.items():
+            if name in RESERVED_PARAMS:
+                continue
+            field = self.filters.get(name)
+            if field is None:
+                raise ContentQueryError(f'Unknown filter for {self.name}: {name}')
+            try:
+                if name == 'id':
+                    queryset = queryset.filter(pk__in=[field.to_python(pk) for pk in value.split(',')])
+                else:
+                    queryset = queryset.filter(**{field.name: field.to_python(value)})
+            except ValidationError:
+                raise ContentQueryError(f'Invalid value for {name}: {value}')
+        return queryset
+
+    def _include(self, key, items):
+        """Set include ``key`` of every payload in ``items`` with one query, as prefetch_related() would."""
+        resource_name, relation = self.includes[key]
+        related = RESOURCES[resource_name]
+        field = self.model._meta.get_field(relation)
+        path = _reverse_path(field)
+        rows = list(
+            related.queryset()
+            .filter(**{f'{path}__in': [item['id'] for item in items]})
+            .order_by(*related.ordering)
+            .values(*related.serializer.columns, **{PARENT_KEY: F(path)})
+        )
+        payloads = related.serializer.serialize_rows(rows)
+        if field.one_to_many or field.many_to_many:
+            grouped = defaultdict(list)
+            for row, payload in zip(rows, payloads):
+                grouped[row[PARENT_KEY]].append(payload)
+            for item in items:
+                item[key] = grouped.get(item['id'], [])
+        else:
+            by_parent = {row[PARENT_KEY]: payload for row, payload in zip(rows, payloads)}
+            for item in items:
+                item[key] = by_parent.get(item['id'])
+
+    def page(self, params):
+        """The response for query parameters ``params``, a dict of strings."""
+        keys = self._selected(params.get('fields'), self.serializer.fields, 'fields')
+        serializer = self.serializer.only({'id', *keys}) if keys else self.serializer
+        includes = self._selected(params.get('include'), self.includes, 'include')
+        per_page = params.get('per_page') or str(DEFAULT_PER_PAGE)
+        if not per_page.isdigit():
+            raise ContentQueryError(f'Invalid value for per_page: {per_page}')
+        per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+
+        columns = dict.fromkeys([*serializer.columns, *(field.lstrip('-') for field in self.ordering)])
+        rows, next_cursor = keyset_page(
+            self._filter(self.queryset(), params).values(*columns),
+            self.ordering, self.cursor_types, params.get('cursor', ''), per_page,
+        )
+        items = serializer.serialize_rows(rows)
+        if items:
+            for key in includes:
+                self._include(key, items)
+        return {
+            'items': items,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor,
+            'per_page': per_page,
+        }
+
+    def models(self):
+        """This model and every model it can include, for the ETag."""
+        return [self.model, *(RESOURCES[name].model for name, _ in self.includes.values())]
+
+
+RESOURCES = {
+    resource.name: resource
+    for resource in [
+        # --- kuai_club ---
+        ContentResource(
+            'news', kuai.News,
+            fields=dict(
+                id=Column(), title=Column(), slug=Column(), summary=Column(), content=Column(), url=Column(),
+                image_url=Media('image'), background_image_url=Media('background_image'),
+                publish_date=DateTime(),
+            ),
+            ordering=['-publish_date', 'id'],
+            visible=dict(is_published=True, publish_date__isnull=False),
+            filters=['slug'],
+        ),
+        ContentResource(
+            'research', kuai.Research,
+            fields=dict(
+                id=Column(), title=Column(), slug=Column(), summary=Column(), content=Column(),
+                researchers=Column(), category=Column(), institution=Column(), document_url=Column(),
+                image_url=Media('image'), publish_date=DateTime(),
+            ),
+            ordering=['-publish_date', 'id'],
+            visible=dict(is_published=True, publish_date__isnull=False),
+            filters=['slug', 'category'],
+        ),
+        ContentResource(
+            'resources', kuai.Resource,
+            fields=dict(
+                id=Column(), title=Column(), slug=Column(), description=Column(),
+                file_url=Media('file'), external_url=Text(), resource_type=Column(),
+            ),
+            ordering=['title', 'id'],
+            visible=dict(is_active=True),
+            filters=['slug', 'resource_type'],
+        ),
+        ContentResource(
+            'leaders', kuai.Leader,
+            fields=dict(
+                id=Column(), full_name=Column(), position=Column(), bio=Column(), photo_url=Media('photo'),
+                linkedin_url=Text(), github_url=Text(), personal_website=Text(),
+                year_served=Column(), category=Column(), start_date=DateTime(), end_date=DateTime(),
+            ),
+            ordering=['-year_served', 'full_name', 'id'],
+            filters=['category'],
+        ),
+        ContentResource(
+            'hero-slides', kuai.HeroSlide,
+            fields=dict(
+                id=Column(), title=Column(), subtitle=Text(), description=Text(), image_url=Media('image'),
+                button1_text=Column(), button1_url=Column(), button1_style=Column(),
+                button2_text=Column(), button2_url=Column(), button2_style=Column(),
+            ),
+            ordering=['order', 'id'],
+            visible=dict(is_active=True),
+        ),
+        ContentResource(
+            'gallery', kuai.GalleryImage,
+            fields=dict(id=Column(), title=Column(), caption=Column(), image_url=Media('image'), upload_date=DateTime()),
+            ordering=['-upload_date', 'id'],
+        ),
+        ContentResource(
+            'partners', kuai.Partner,
+            fields=dict(
+                id=Column(), name=Column(), description=Column(), partner_type=Column(),
+                image_url=Media('image'), website_link=Text(), display_order=Column(),
+            ),
+            ordering=['display_order', 'name', 'id'],
+            visible=dict(is_active=True),
+        ),
+        ContentResource(
+            'projects', kuai.Project,
+            fields=dict(
+                id=Column(), title=Column(), slug=Column(), summary=Column(), description=Column(),
+                image_url=Media('image'), publish_date=DateTime(), url=Text(), project_leader=Text(),
+            ),
+            ordering=['-publish_date', 'id'],
+            visible=dict(is_published=True),
+            filters=['slug'],
+        ),
+        ContentResource(
+            'events', kuai.Event,
+            fields=dict(
+                id=Column(), title=Column(), slug=Column(), summary=Column(), description=Column(),
+                location=Column(), event_url=Text(), image_url=Media('image'),
+                event_start=DateTime(), event_end=DateTime(),
+            ),
+            ordering=['event_start', 'id'],
+            visible=dict(is_published=True, event_start__isnull=False),
+            filters=['slug'],
+        ),
+        # --- indabax_app ---
+        ContentResource(
+            'indabax-sessions', indabax.Session,
+            fields=dict(
+                id=Column(), title=Column(), tagline=Text(), description=Text(), session_date=DateTime(),
+                venue=Text(), start_time=DateTime(), end_time=DateTime(),
+                google_photos_link=Text(), guest_speakers_info=Text(),
+            ),
+            ordering=['-session_date', 'id'],
+            visible=dict(is_published=True),
+            includes={
+                'speakers': ('indabax-leaders', 'speakers'),
+                'images': ('indabax-session-images', 'images'),
+            },
+        ),
+        ContentResource(
+            'indabax-session-images', indabax.SessionImage,
+            fields=dict(id=Column(), session=Column(), image_url=Media('image'), caption=Text(), uploaded_at=DateTime()),
+            ordering=['-uploaded_at', 'id'],
+            visible=dict(session__is_published=True),
+            filters=['session'],
+        ),
+        ContentResource(
+            'indabax-tutorials', indabax.Tutorial,
+            fields=dict(
+                id=Column(), title=Column(), category=Column(), video_url=Column(),
+                description=Column(), date_posted=DateTime(),
+            ),
+            ordering=['-date_posted', 'id'],
+            filters=['category'],
+            includes={'category': ('indabax-tutorial-categories', 'category')},
+        ),
+        ContentResource(
+            'indabax-tutorial-categories', indabax.TutorialCategory,
+            fields=dict(id=Column(), name=Column()),
+            ordering=['name', 'id'],
+        ),
+        ContentResource(
+            'indabax-albums', indabax.Album,
+            fields=dict(id=Column(), title=Column(), description=Text(), link=Column()),
+            ordering=['-id'],
+            visible=dict(is_published=True),
+        ),
+        ContentResource(
+            'indabax-leaders', indabax.Leader,
+            fields=dict(
+                id=Column(), name=Column(), position=Column(), photo_url=Media('photo'), term_start=DateTime(),
+                is_current=Column(), bio=Column(), linkedin_url=Column(), twitter_url=Column(), github_url=Column(),
+            ),
+            ordering=['-is_current', 'position', 'id'],
+        ),
+        ContentResource(
+            'indabax-events', indabax.Event,
+            fields=dict(
+                id=Column(), title=Column(), description=Column(), date=DateTime(), time=Text(),
+                location=Text(), registration_url=Text(), image_url=Media('image'), is_upcoming=Column(),
+            ),
+            ordering=['-date', 'id'],
+        ),
+        ContentResource(
+            'indabax-partners', indabax.Partner,
+            fields=dict(id=Column(), name=Column(), logo_url=Media('logo'), website_url=Text(), order=Column()),
+            ordering=['order', 'id'],
+        ),
+        ContentResource(
+            'indabax-gallery', indabax.GalleryImage,
+            fields=dict(id=Column(), title=Column(), description=Column(), image_url=Media('image'), order=Column()),
+            ordering=['order', 'id'],
+        ),
+    ]
+}
@@ -1,158 +1,50 @@
-from django.core.cache import cache
-from .models import (
-    SiteSettings,
-    Aboutus,
-    Leader,
-    News,
-    Event,
-    Research,
-    Resource,
-    CommunityOutreach,
-    Project,
-    HeroSlide,
-    GalleryImage,
-    Partner,
-    ContactInfo,
-    ClubJoinRequest
-)
+# The layout ("site chrome") data comes from the single cached bundle built
+# in kuai_club.chrome, read through the request's SiteData so views and
+# processors share one cache read.
+# Processors hand templates lazy proxies: nothing is read from the cache or
+# the database until a template actually touches the variable.
+from functools import partial
 
-def site_settings(request):
-    """Global site settings."""
-    settings = cache.get('site_settings')
-    if not settings:
-        settings = SiteSettings.objects.first()
-        cache.set('site_settings', settings, 300)
-    return {'site_settings': settings}
+from django.utils.functional import SimpleLazyObject
+from .chrome import SITE_CHROME_VARIABLES
+from .models import Leader
+from .page_cache import CSRF_PLACEHOLDER
+from .site_data import get_site_data
 
 
-from django.core.cache import cache
-from .models import Aboutus
+def request_site_chrome(request):
+    """Return the layout bundle, fetched at most once per request."""
+    return get_site_data(request).chrome
 
-def about_pages_processor(request):
-    """Context processor to provide about_pages (list) and about_page (first item)."""
-    
-    about_pages = cache.get('about_pages')
-    about_page = cache.get('about_page')
 
-    if not about_pages:
-        about_pages = Aboutus.objects.all()
-        cache.set('about_pages', about_pages, 300)
+def _chrome_value(request, name):
+    return request_site_chrome(request)[name]
 
-    if not about_page:
-        about_page = Aboutus.objects.first()
-        cache.set('about_page', about_page, 300)
 
+def site_chrome(request):
+    """Settings, about pages, navbar lists, hero, gallery, partners and contact."""
     return {
-        'about_pages': about_pages,
-        'about_page': about_page,
+        name: SimpleLazyObject(partial(_chrome_value, request, name))
+        for name in SITE_CHROME_VARIABLES
     }
 
 
-
-def leader_processor(request):
-    """Pass categorized leaders globally to templates."""
-    leaders_student = Leader.objects.filter(category='student').order_by('position')
-    leaders_executive = Leader.objects.filter(category='executive').order_by('position')
-    leaders_faculty = Leader.objects.filter(category='faculty').order_by('position')
-
-    return {
-        'leaders_student': leaders_student,
-        'leaders_executive': leaders_executive,
-        'leaders_faculty': leaders_faculty
-    }
-
-
-def news_processor(request):
-    """News items with caching for 5 minutes."""
-    news = cache.get('news_items')
-    if not news:
-        news = News.objects.filter(is_published=True).order_by('-publish_date')
-        cache.set('news_items', news, 300)  # Cache for 300 seconds = 5 minutes
-    return {'news': news}
-
-
-def events_processor(request):
-    """Events - cached for 5 minutes."""
-    events = cache.get('events_list')
-    if not events:
-        events = Event.objects.filter(is_published=True).order_by('event_start')
-        cache.set('events_list', events, 300)
-    return {'events': events}
-
-
-def research_processor(request):
-    """Research links."""
-    research = cache.get('research_links')
-    if not research:
-        research = Research.objects.all().order_by('title')
-        cache.set('research_links', research, 300)
-    return {'research': research}
+def page_cache_csrf(request):
+    """Swap in a placeholder CSRF token while a page is rendered for the full-page cache."""
+    if getattr(request, 'page_cache_build', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
 
 
-def resource_processor(request):
-    """Categorized resources for navbar dropdown."""
-    resources = cache.get('navbar_resources')
-    if not resources:
-        resources = Resource.objects.filter(is_active=True).order_by('title')
-        cache.set('navbar_resources', resources, 300)
-    return {'resources': resources}  # still using 'services' in template
+def _leaders(category):
+    return list(Leader.objects.filter(category=category).order_by('position'))
 
 
+def leader_processor(request):
+    """Pass categorized leaders globally to templates, queried on first use."""
+    return {
+        'leaders_student': SimpleLazyObject(partial(_leaders, 'student')),
+        'leaders_executive': SimpleLazyObject(partial(_leaders, 'executive')),
+        'leaders_faculty': SimpleLazyObject(partial(_leaders, 'faculty')),
+    }
 
-def community_processor(request):
-    """Community outreach links."""
-    community = cache.get('community_links')
-    if not community:
-        community = CommunityOutreach.objects.all().order_by('title')
-        cache.set('community_links', community, 300)
-    return {'community': community}
-
-
-def project_processor(request):
-    """Project links processor for navbar."""
-    projects = cache.get('project_links')
-    if not projects:
-        projects = Project.objects.filter(is_published=True).order_by('title')
-        cache.set('project_links', projects, 300)
-    return {'projects': projects}
-
-def hero_processor(request):
-    """Hero slides context processor with caching."""
-    hero_slides = cache.get('hero_slides')
-    if not hero_slides:
-        hero_slides = HeroSlide.objects.filter(is_active=True).order_by('order')[:5]  # Only active slides, ordered, limited to 5
-        cache.set('hero_slides', hero_slides, 300)  # Cache for 5 minutes
-    return {'hero_slides': hero_slides}
-
-
-def gallery_processor(request):
-    """Latest gallery images with caching for 5 minutes."""
-    gallery_images = cache.get('latest_gallery_images')
-    if not gallery_images:
-        gallery_images = GalleryImage.objects.order_by('-upload_date', '-id')[:10]  # Adjust number if needed
-        cache.set('latest_gallery_images', gallery_images, 300)  # Cache for 300 seconds
-    return {'gallery_images': gallery_images}
-
-def partner_processor(request):
-    """Active partners for the footer."""
-    partners = cache.get('active_partners')
-    if not partners:
-        partners = Partner.objects.filter(is_active=True).order_by('name')  # Order by name or any other field
-        cache.set('active_partners', partners, 300)  # Cache for 5 minutes
-    return {'partners': partners}
-
-def contact_info_processor(request):
-    """Contact information for the footer."""
-    contact_info = cache.get('contact_info')
-    if not contact_info:
-        contact_info = ContactInfo.objects.first()  # Assuming only one contact info object
-        cache.set('contact_info', contact_info, 300)  # Cache for 5 minutes
-    return {'contact_info': contact_info}
-
-def join_request_processor(request):
-    """Club join requests for the admin dashboard."""
-    join_requests = cache.get('club_join_requests')
-    if not join_requests:
-        join_requests = ClubJoinRequest.objects.all().order_by('-date_joined')
-        cache.set('club_join_requests', join_requests, 300)  # Cache for 5 minutes
-    return {'join_requests': join_requests}
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Moving uploads made before ContentAddressedStorage into content-addressed blobs.
+
+plan_dedupe() hashes every file referenced by a FileField/ImageField of
+either app, or by a MediaAsset, and maps each old name to the blob name of
+its content. apply_dedupe() copies each distinct content to its blob once
+(with its WebP/AVIF siblings), repoints every reference in one
+transaction, drops the cached pages that linked the old names and then
+deletes the old files. Used by the ``dedupe_media`` management command.
+"""
+import os
+from collections import namedtuple
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .media import file_fields, referenced_field_names, sibling_names
+from .models import ImageJob, MediaAsset
+from .storage import blob_name, file_digest
+
+# moves: {old name: blob name} for every file that isn't its blob yet;
+# missing: referenced names with no file behind them
+DedupePlan = namedtuple('DedupePlan', 'moves missing')
+
+
+def referenced_names():
+    """Every storage name referenced by a file field or a MediaAsset."""
+    names = referenced_field_names()
+    for source, derivative, variants in MediaAsset.objects.values_list('source', 'derivative', 'variants'):
+        names.add(source)
+        if derivative:
+            names.add(derivative)
+        names.update(name for _, name in variants)
+    return names
+
+
+def plan_dedupe(storage=default_storage):
+    moves, missing = {}, []
+    for name in sorted(referenced_names()):
+        if not storage.exists(name):
+            missing.append(name)
+            continue
+        with storage.open(name, 'rb') as file:
+            target = blob_name(file_digest(file), os.path.splitext(name)[1])
+        if target != name:
+            moves[name] = target
+    return DedupePlan(moves, missing)
+
+
+def reclaimable_bytes(moves, storage=default_storage):
+    """Disk space freed by applying ``moves``: the old files minus one copy of each new blob."""
+    freed = sum(storage.size(old) for old in moves)
+    for target in set(moves.values()):
+        if not storage.exists(target):
+            freed -= storage.size(next(old for old, new in moves.items() if new == target))
+    return freed
+
+
+def _copy(storage, source, target):
+    if storage.exists(source) and not storage.exists(target):
+        with storage.open(source, 'rb') as file:
+            # The exact name: save() would hash the content again
+            storage._save(target, file)
+
+
+def _repoint_assets(moves):
+    # Fingerprints hash the content, which doesn't change: only names do
+    for asset in MediaAsset.objects.all():
+        asset.source = moves.get(asset.source, asset.source)
+        asset.derivative = moves.get(asset.derivative, asset.derivative)
+        asset.variants = [[width, moves.get(name, name)] for width, name in asset.variants]
+        asset.save(update_fields=['source', 'derivative', 'variants', 'updated_at'])
+
+
+def apply_dedupe(moves, storage=default_storage, delete=True):
+    """Move the files in ``moves`` to their blobs and repoint every reference; returns the changed models."""
+    from .signals import content_changed
+
+    for old, new in moves.items():
+        _copy(storage, old, new)
+        for old_sibling, new_sibling in zip(sibling_names(old), sibling_names(new)):
+            _copy(storage, old_sibling, new_sibling)
+
+    changed = set()
+    with transaction.atomic():
+        for model, field in file_fields():
+            manager = model._base_manager
+            column = field.attname
+            old_names = manager.filter(**{f'{column}__in': list(moves)}).values_list(column, flat=True).distinct()
+            for old in list(old_names):
+                manager.filter(**{column: old}).update(**{column: moves[old]})
+                changed.add(model)
+        _repoint_assets(moves)
+        for old, new in moves.items():
+            ImageJob.objects.filter(source=old).update(source=new)
+
+    # update() sends no post_save: drop the pages that link the old names
+    for model in changed:
+        content_changed(model)
+
+    if delete:
+        targets = set(moves.values())
+        for old in moves:
+            for name in [old, *sibling_names(old)]:
+                if name not in targets and storage.exists(name):
+                    storage.delete(name)
+    return changed
@@ -0,0 +1,48 @@
+"""
+Cache for layout partials (navbar, footer, gallery).
+
+Rendered HTML is keyed on the per-model content versions of the models a
+fragment shows, so an admin edit to one of them makes the fragment stale
+immediately while edits elsewhere leave it cached. Hit and miss counts are
+kept per fragment in this process and exposed by the ``cache_stats`` view.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .versioning import get_model_versions
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def fragment_key(name, models, vary_on=()):
+    versions = get_model_versions(models)
+    digest = hashlib.md5(repr((versions, tuple(vary_on))).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def get_or_render(name, models, render, vary_on=()):
+    """Return the cached HTML for fragment ``name``, calling ``render()`` on a miss."""
+    key = fragment_key(name, models, vary_on)
+    html = cache.get(key)
+    hit = html is not None
+    if not hit:
+        html = render()
+        cache.set(key, html, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24))
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+    return html
+
+
+def fragment_cache_stats():
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def reset_fragment_cache_stats():
+    with _stats_lock:
+        _stats.clear()
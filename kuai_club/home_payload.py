@@ -0,0 +1,114 @@
+"""
+The batched home page document behind /api/home/.
+
+Client-side rendering of the home page needs the hero slides, the
+upcoming and past events, the projects, news, partners and gallery:
+several round trips through the separate APIs. Each of those is a Section
+here: the models it is built from and a function returning its payload.
+
+Every section is serialized to JSON once and cached, like the layout
+fragments, under a key made of its models' versions (kuai_club.versioning)
+and, for clock-dependent sections, the listing boundary they were built
+for. Its public version is a hash of that JSON, so it only changes when
+the content does. The whole document is assembled from those bytes and
+cached with a gzip copy beside it, so a full request costs a few cache
+reads and no serialization or compression. Clients holding older copies
+send ``since`` to get only the sections whose version changed.
+"""
+import gzip
+import hashlib
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .conditional import make_etag
+from .versioning import get_model_versions
+
+# models: the models the payload shows. build(): the payload, any JSON
+# value. clock(): for sections that change by themselves, the Unix time
+# until which the data they are built from is fresh (or None).
+Section = namedtuple('Section', 'models build clock', defaults=(None,))
+
+# body: JSON bytes; gzipped: their gzip copy, precomputed for the full
+# document only; fresh_until: earliest clock() of the sections, or None
+HomeDocument = namedtuple('HomeDocument', 'etag versions body gzipped fresh_until')
+
+# SectionData: version (content hash) and the payload as JSON bytes
+SectionData = namedtuple('SectionData', 'version data')
+
+
+def _timeout():
+    # Keys change with the content; the timeout only reclaims old ones
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def section_keys(sections):
+    """``{name: (cache key, fresh_until)}`` for the current state of every section."""
+    labels = sorted({model._meta.label for section in sections.values() for model in section.models})
+    versions = dict(zip(labels, get_model_versions(labels)))
+    keys = {}
+    for name, section in sections.items():
+        fresh_until = section.clock() if section.clock else None
+        parts = [versions[model._meta.label] for model in section.models]
+        keys[name] = (f'home_section:{name}:{make_etag(*parts, fresh_until)}', fresh_until)
+    return keys
+
+
+def get_section(section, key):
+    """The cached SectionData of ``section`` under ``key``, built on a miss."""
+    cached = cache.get(key)
+    if cached is None:
+        data = json.dumps(section.build(), cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+        cached = SectionData(hashlib.sha256(data).hexdigest()[:16], data)
+        cache.set(key, cached, _timeout())
+    return cached
+
+
+def assemble(versions, fragments):
+    """
+    The document ``{"versions": {...}, "sections": {...}}`` as bytes, made
+    from already serialized section ``fragments`` without parsing them.
+    """
+    parts = [b'{"versions":', json.dumps(versions, separators=(',', ':')).encode(), b',"sections":{']
+    parts.append(b','.join(json.dumps(name).encode() + b':' + data for name, data in fragments.items()))
+    parts.append(b'}}')
+    return b''.join(parts)
+
+
+def _fresh_until(keys):
+    return min((fresh_until for _, fresh_until in keys.values() if fresh_until is not None), default=None)
+
+
+def get_document(sections):
+    """The full HomeDocument, from the cache when no section changed."""
+    keys = section_keys(sections)
+    fresh_until = _fresh_until(keys)
+    document_key = f"home_document:{make_etag(*(key for key, _ in keys.values()))}"
+    document = cache.get(document_key)
+    if document is None:
+        data = {name: get_section(sections[name], key) for name, (key, _) in keys.items()}
+        versions = {name: section.version for name, section in data.items()}
+        body = assemble(versions, {name: section.data for name, section in data.items()})
+        document = HomeDocument(
+            make_etag(versions), versions, body, gzip.compress(body, compresslevel=9, mtime=0), fresh_until,
+        )
+        cache.set(document_key, document, _timeout())
+    return document
+
+
+def get_partial(sections, names, since):
+    """
+    A HomeDocument of sections ``names`` only, leaving out those whose
+    version is the one in ``since`` (``{name: version}``). Versions of all
+    ``names`` are sent either way. Nothing is precompressed.
+    """
+    keys = section_keys({name: sections[name] for name in names})
+    data = {name: get_section(sections[name], key) for name, (key, _) in keys.items()}
+    versions = {name: section.version for name, section in data.items()}
+    changed = {name: section.data for name, section in data.items() if since.get(name) != section.version}
+    return HomeDocument(
+        make_etag(versions, sorted(changed)), versions, assemble(versions, changed), None, _fresh_until(keys),
+    )
@@ -0,0 +1,277 @@
+"""
+Database-backed queue for image processing.
+
+Saving a model with IMAGE_SPECS (see kuai_club.images) queues one ImageJob
+per uploaded image instead of running Pillow inside the admin request. The
+``process_images`` management command claims jobs one at a time, writes
+the resized copy and its responsive variants (IMAGE_VARIANT_WIDTHS) to
+separate files, each with WebP/AVIF siblings for the media view to
+negotiate, records them as a MediaAsset and points the model field at
+the copy. The original upload is never modified, so pages show it until
+the copy is ready. Failed jobs are retried with exponential backoff, up to
+IMAGE_JOB_MAX_ATTEMPTS times.
+
+A MediaAsset is keyed on the fingerprint of its upload's content and the
+settings it was processed with, so an unchanged image is never encoded
+twice: not when its model is saved again, nor when the same file is
+uploaded for another row.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Q
+from django.utils.timezone import now
+from PIL import Image
+
+from .images import (
+    PIPELINE_VERSION,
+    alternate_formats,
+    dominant_color,
+    encode,
+    encode_alternates,
+    extension,
+    output_format,
+    placeholder,
+    prepare,
+    render_derivative,
+    render_variants,
+    spec_key,
+)
+from .models import ImageJob, MediaAsset
+from .storage import blob_digest, file_digest
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _widths():
+    return tuple(_setting('IMAGE_VARIANT_WIDTHS', (320, 640, 1024, 1920)))
+
+
+def fingerprint(digest, spec):
+    """Identify the processing of content ``digest`` with ``spec`` and the current variant widths."""
+    return hashlib.sha256(f'{PIPELINE_VERSION}:{digest}:{spec!r}:{_widths()!r}'.encode()).hexdigest()
+
+
+def source_digest(storage, source):
+    digest = blob_digest(source)
+    if digest is None:
+        # Uploaded before content-addressed storage: read it
+        with storage.open(source, 'rb') as file:
+            digest = file_digest(file)
+    return digest
+
+
+def enqueue(instance):
+    """Queue a job for each image field of ``instance`` whose file is new."""
+    specs = getattr(type(instance), 'IMAGE_SPECS', None) or {}
+    content_type = None
+    for field_name, spec in specs.items():
+        name = getattr(instance, field_name).name
+        if not name:
+            continue
+        # The resized copy itself, or an upload that needed no copy with
+        # this spec. Only blob names tell the content without reading it.
+        digest = blob_digest(name)
+        done = Q(derivative=name)
+        if digest:
+            done |= Q(fingerprint=fingerprint(digest, spec), derivative='')
+        else:
+            done |= Q(source=name, derivative='')
+        if MediaAsset.objects.filter(done).exists():
+            continue
+        content_type = content_type or ContentType.objects.get_for_model(instance)
+        ImageJob.objects.get_or_create(
+            content_type=content_type,
+            object_id=instance.pk,
+            field_name=field_name,
+            source=name,
+            status=ImageJob.PENDING,
+        )
+
+
+def claim_next_job():
+    """Mark the next runnable job as running and return it, or None."""
+    started = now()
+    runnable = (
+        Q(status=ImageJob.PENDING, run_after__lte=started)
+        # A worker that died mid-job leaves it running; take it over
+        | Q(status=ImageJob.RUNNING, updated_at__lt=started - timedelta(seconds=_setting('IMAGE_JOB_TIMEOUT', 600)))
+    )
+    for pk in ImageJob.objects.filter(runnable).values_list('pk', flat=True)[:10]:
+        # Conditional update, so two workers never claim the same job
+        claimed = ImageJob.objects.filter(runnable, pk=pk).update(
+            status=ImageJob.RUNNING,
+            attempts=F('attempts') + 1,
+            updated_at=started,
+        )
+        if claimed:
+            return ImageJob.objects.get(pk=pk)
+    return None
+
+
+def _derived_name(source, suffix, ext):
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'derived', f'{stem}{suffix}{ext}')
+
+
+def _save(storage, name, img, fmt, spec):
+    """Save ``img`` as ``name`` plus a WebP/AVIF sibling per alternate format; return the stored name."""
+    name = storage.save(name, encode(img, fmt, spec))
+    _save_alternates(storage, name, img, fmt)
+    return name
+
+
+def _save_alternates(storage, name, img, fmt):
+    # Siblings are named after the stored file ("x.jpg.webp") so the media
+    # view can find them from the requested path alone. _save() writes that
+    # exact name; save() would let a content-addressed storage rename it.
+    for ext, content in encode_alternates(img, fmt):
+        if storage.exists(name + ext):
+            storage.delete(name + ext)
+        storage._save(name + ext, content)
+
+
+def is_complete(asset, spec):
+    return (
+        (asset.variants or spec.exact)
+        and sorted(asset.encodings) == sorted(fmt.lower() for fmt in alternate_formats())
+        and asset.width is not None
+        and asset.placeholder
+    )
+
+
+def _metadata(storage, name, img, fmt):
+    """MediaAsset metadata of the file ``name`` holding ``img``, so pages never open it to size it."""
+    return {
+        'width': img.width,
+        'height': img.height,
+        'format': fmt,
+        'bytes': storage.size(name),
+        'dominant_color': dominant_color(img),
+        'placeholder': placeholder(img),
+    }
+
+
+def find_asset(key, source):
+    """The MediaAsset with fingerprint ``key``, or the one made for ``source`` before fingerprints."""
+    return (
+        MediaAsset.objects.filter(fingerprint=key).first()
+        or MediaAsset.objects.filter(source=source, fingerprint__isnull=True).first()
+    )
+
+
+def render_asset(storage, source, spec, derivative=''):
+    """
+    Write the resized copy of ``source``, its responsive variants and their
+    WebP/AVIF encodings, and return the MediaAsset fields describing them.
+    Pass the ``derivative`` of an older asset to keep that copy and only
+    add what it lacks. Touches no database, so it can run in another process.
+    """
+    widths = _widths()
+    with storage.open(source, 'rb') as file, Image.open(file) as img:
+        changed = prepare(img, spec, widths)
+        fmt = output_format(img, spec)
+        ext = extension(fmt)
+        resized = render_derivative(img, spec, changed)
+        if resized is None:
+            # Shown as uploaded: it gets the alternate encodings itself
+            derivative = ''
+            _save_alternates(storage, source, img, img.format)
+            metadata = _metadata(storage, source, img, img.format)
+        else:
+            if derivative:
+                # Completing an older asset: keep the copy pages already link to
+                _save_alternates(storage, derivative, resized, fmt)
+            else:
+                derivative = _save(storage, _derived_name(source, '', ext), resized, fmt, spec)
+            metadata = _metadata(storage, derivative, resized, fmt)
+        variants = [
+            [width, _save(storage, _derived_name(source, f'-{width}w', ext), resized, fmt, spec)]
+            for width, resized in render_variants(img, spec, widths)
+        ]
+    return {
+        'derivative': derivative,
+        'spec': spec_key(spec),
+        'variants': variants,
+        'encodings': [fmt.lower() for fmt in alternate_formats()],
+        **metadata,
+    }
+
+
+def save_asset(asset, source, key, fields):
+    """Record the result of render_asset() on ``asset``, or on a new MediaAsset when None."""
+    asset = asset or MediaAsset(source=source)
+    asset.fingerprint = key
+    for field, value in fields.items():
+        setattr(asset, field, value)
+    asset.save()
+    return asset
+
+
+def _derive(model, field_name, source):
+    """
+    Return ``(asset, created)``: the MediaAsset for ``source``, making the
+    resized copy, the responsive variants and their WebP/AVIF encodings if
+    they don't exist yet, and recording the size, format, dominant color
+    and placeholder of the file pages show.
+    """
+    spec = model.IMAGE_SPECS[field_name]
+    storage = model._meta.get_field(field_name).storage
+    key = fingerprint(source_digest(storage, source), spec)
+    asset = find_asset(key, source)
+    if asset is not None and is_complete(asset, spec):
+        return asset, False
+
+    fields = render_asset(storage, source, spec, asset.derivative if asset else '')
+    return save_asset(asset, source, key, fields), True
+
+
+def process_job(job):
+    """Make the derivative for ``job`` and point the model field at it."""
+    from .signals import content_changed
+
+    model = job.content_type.model_class()
+    manager = model._default_manager
+    # Skip rows deleted or re-uploaded since the job was queued
+    if not manager.filter(pk=job.object_id, **{job.field_name: job.source}).exists():
+        return
+
+    asset, created = _derive(model, job.field_name, job.source)
+    updated = 0
+    if asset.derivative:
+        updated = manager.filter(pk=job.object_id, **{job.field_name: job.source}).update(
+            **{job.field_name: asset.derivative}
+        )
+    if created or updated:
+        # update() sends no post_save, and new variants change the srcset
+        # of pages already cached: drop them ourselves
+        content_changed(model)
+
+
+def run_job(job):
+    """Run a claimed job, recording success or scheduling a retry. Returns True on success."""
+    try:
+        process_job(job)
+    except Exception as exc:
+        logger.exception("Image job %s failed", job.pk)
+        job.last_error = f'{type(exc).__name__}: {exc}'
+        if job.attempts >= _setting('IMAGE_JOB_MAX_ATTEMPTS', 5):
+            job.status = ImageJob.FAILED
+        else:
+            job.status = ImageJob.PENDING
+            job.run_after = now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+        job.save(update_fields=['status', 'last_error', 'run_after', 'updated_at'])
+        return False
+    job.status = ImageJob.DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return True
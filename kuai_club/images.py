@@ -0,0 +1,209 @@
+"""
+Pillow side of image processing: what each uploaded image is resized to.
+
+Models declare ``IMAGE_SPECS = {field_name: ImageSpec(...)}``. Nothing here
+runs inside Model.save(); kuai_club.image_jobs queues the work and the
+``process_images`` worker calls prepare() on the opened upload,
+render_derivative() and render_variants() on it, then encode() and
+encode_alternates() on the result, and records the dominant_color() and
+placeholder() of what pages show.
+
+prepare() decodes JPEGs at the smallest scale that still covers every size
+rendered from them, refuses anything over IMAGE_MAX_PIXELS pixels before
+decoding it and turns the pixels upright per the EXIF orientation. Copies
+are saved without EXIF/XMP, so an upload that carries any is never shown
+as is.
+"""
+import base64
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import ExifTags, Image, ImageFilter, ImageOps, features
+
+# size: (max width, max height), None to show the upload at its own size.
+# exact: resize to exactly ``size`` instead of fitting inside it (no
+# responsive variants then). format: Pillow format name, None keeps the upload's.
+ImageSpec = namedtuple('ImageSpec', 'size exact format quality', defaults=(None, False, None, None))
+
+
+def spec_key(spec):
+    """How a MediaAsset records the ImageSpec it was made with."""
+    return repr(tuple(spec))
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'AVIF': '.avif'}
+
+# Part of every MediaAsset fingerprint: bump it when a change here makes
+# the existing copies wrong, and reprocess_images redoes them all
+PIPELINE_VERSION = 2
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+# Scale denominators the JPEG decoder supports, largest first
+JPEG_DRAFT_SCALES = (8, 4, 2)
+
+# Formats that get a WebP/AVIF sibling, and the default quality of those
+ALTERNATE_SOURCE_FORMATS = {'JPEG', 'PNG'}
+ALTERNATE_QUALITY = {'WEBP': 80, 'AVIF': 60}
+
+
+class ImageTooLarge(Exception):
+    """The upload would decode to more pixels than IMAGE_MAX_PIXELS."""
+
+
+def extension(fmt):
+    return EXTENSIONS.get(fmt, f'.{fmt.lower()}')
+
+
+def output_format(img, spec):
+    return spec.format or img.format or 'JPEG'
+
+
+def _is_animated(img):
+    # Resizing would keep only the first frame
+    return getattr(img, 'is_animated', False)
+
+
+def encode(img, fmt, spec):
+    """Return ``img`` encoded as ``fmt`` in a ContentFile."""
+    if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    options = {'optimize': True}
+    if spec.quality:
+        options['quality'] = spec.quality
+    # The only metadata kept: without it colors shift
+    if img.info.get('icc_profile'):
+        options['icc_profile'] = img.info['icc_profile']
+    buffer = BytesIO()
+    img.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def alternate_formats():
+    """IMAGE_ALTERNATE_FORMATS that this Pillow build can write, best first."""
+    wanted = getattr(settings, 'IMAGE_ALTERNATE_FORMATS', ('AVIF', 'WEBP'))
+    return [fmt for fmt in wanted if features.check(fmt.lower())]
+
+
+def encode_alternates(img, fmt):
+    """Yield ``(extension, ContentFile)`` for each alternate encoding of an image saved as ``fmt``."""
+    if fmt not in ALTERNATE_SOURCE_FORMATS:
+        return
+    for alternate in alternate_formats():
+        if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        buffer = BytesIO()
+        img.save(buffer, alternate, quality=ALTERNATE_QUALITY.get(alternate, 80))
+        yield extension(alternate), ContentFile(buffer.getvalue())
+
+
+def dominant_color(img):
+    """The most common color of ``img`` after reducing it to a few colors, as ``#rrggbb``."""
+    sample = img.copy()
+    sample.thumbnail((64, 64))
+    palette = sample.convert('RGB').quantize(colors=5)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def placeholder(img):
+    """A tiny blurred JPEG of ``img`` as a data: URI, shown inline while the image loads."""
+    sample = img.copy()
+    sample.thumbnail((16, 16))
+    sample = sample.convert('RGB').filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    sample.save(buffer, 'JPEG', quality=50)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def _needed_scale(size, spec, widths):
+    """The smallest fraction of ``size`` that still covers the copy and the widest variant."""
+    width, height = size
+    scales = [max(widths) / width] if widths else []
+    if spec.size is None:
+        scales.append(1)
+    elif spec.exact:
+        scales.append(max(spec.size[0] / width, spec.size[1] / height))
+    else:
+        scales.append(min(spec.size[0] / width, spec.size[1] / height))
+    return max(scales)
+
+
+def prepare(img, spec, widths):
+    """
+    Get an opened upload ready for rendering. JPEGs are decoded at 1/2, 1/4
+    or 1/8 scale when that still covers what will be rendered, or when it
+    is the only way to fit IMAGE_MAX_PIXELS; anything still over budget
+    raises ImageTooLarge before it is decoded. Then the pixels are turned
+    upright per the EXIF orientation.
+
+    Returns True when the pixels or metadata no longer match the upload, so
+    it can't be shown as is.
+    """
+    budget = getattr(settings, 'IMAGE_MAX_PIXELS', 25_000_000)
+    exif = img.getexif()
+    orientation = exif.get(ExifTags.Base.Orientation, 1)
+    has_metadata = bool(exif) or 'xmp' in img.info
+    original_size = img.size
+
+    if img.format == 'JPEG':
+        upright = img.size[::-1] if orientation in TRANSPOSED_ORIENTATIONS else img.size
+        needed = _needed_scale(upright, spec, widths)
+        scale = next((scale for scale in JPEG_DRAFT_SCALES if 1 / scale >= needed), 1)
+        while img.width * img.height / scale ** 2 > budget and scale < JPEG_DRAFT_SCALES[0]:
+            scale *= 2
+        if scale > 1:
+            # The decoder keeps at least the size asked for
+            img.draft(img.mode, (img.width // scale, img.height // scale))
+    if img.width * img.height > budget:
+        raise ImageTooLarge(f'{img.width}x{img.height} is over IMAGE_MAX_PIXELS ({budget})')
+
+    ImageOps.exif_transpose(img, in_place=True)
+    return img.size != original_size or orientation != 1 or has_metadata
+
+
+def needs_derivative(img, spec):
+    if _is_animated(img):
+        return False
+    if output_format(img, spec) != img.format:
+        return True
+    if spec.size is None:
+        return False
+    if spec.exact:
+        return img.size != spec.size
+    max_width, max_height = spec.size
+    return img.width > max_width or img.height > max_height
+
+
+def render_derivative(img, spec, changed=False):
+    """
+    Return ``img`` resized to ``spec`` as a new Image, or None when the
+    upload can be shown as it is. ``changed``: what prepare() returned.
+    """
+    if not (changed and not _is_animated(img)) and not needs_derivative(img, spec):
+        return None
+    if spec.exact:
+        return img.resize(spec.size, Image.Resampling.LANCZOS)
+    out = img.copy()
+    if spec.size:
+        out.thumbnail(spec.size, Image.Resampling.LANCZOS)
+    return out
+
+
+def variant_widths(img, widths):
+    """The widths to render: those below the upload's, plus the upload's own if smaller than the largest."""
+    chosen = [width for width in sorted(widths) if width < img.width]
+    if img.width <= max(widths):
+        chosen.append(img.width)
+    return chosen
+
+
+def render_variants(img, spec, widths):
+    """Yield ``(width, Image)`` for each responsive width of ``img``."""
+    if spec.exact or _is_animated(img):
+        return
+    for width in variant_widths(img, widths):
+        height = max(1, round(img.height * width / img.width))
+        yield width, img.resize((width, height), Image.Resampling.LANCZOS)
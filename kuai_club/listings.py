@@ -0,0 +1,94 @@
+"""
+Cached listings that depend on the clock: upcoming/past events and current leaders.
+
+Each entry is keyed on its model's version (see kuai_club.versioning), so
+edits show up at once, and stays fresh until the next moment its answer
+can change by itself: the next event_start or event_end, or the first day
+on which a leader's term starts or is over. After that boundary the next
+request still gets the old value while a background thread rebuilds it.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils.timezone import now
+
+from .cache_backends import get_or_compute_until
+from .models import Event, Leader
+from .versioning import get_model_versions
+
+
+def next_event_change(at):
+    """Return the first event_start or event_end at or after ``at``, or None."""
+    bounds = Event.objects.filter(is_published=True).aggregate(
+        next_start=Min('event_start', filter=Q(event_start__gte=at)),
+        next_end=Min('event_end', filter=Q(event_end__gte=at)),
+    )
+    changes = [moment for moment in bounds.values() if moment is not None]
+    return min(changes, default=None)
+
+
+def next_leader_change(at):
+    """Return the start of the next day on which a term starts or has ended, or None."""
+    today = at.date()
+    bounds = Leader.objects.aggregate(
+        next_start=Min('start_date', filter=Q(start_date__gt=today)),
+        last_day=Min('end_date', filter=Q(end_date__gte=today)),
+    )
+    days = []
+    if bounds['next_start']:
+        days.append(bounds['next_start'])
+    if bounds['last_day']:
+        days.append(bounds['last_day'] + timedelta(days=1))
+    if not days:
+        return None
+    # Views compare against timezone.now().date(), which is the UTC date
+    return datetime.combine(min(days), time.min, tzinfo=dt_timezone.utc)
+
+
+def _listing(name, model, build, next_change):
+    version, = get_model_versions([model._meta.label])
+
+    def compute():
+        at = now()
+        boundary = next_change(at)
+        return build(at), boundary.timestamp() if boundary else None
+
+    return get_or_compute_until(
+        f'listing:{name}:{version}',
+        compute,
+        stale_timeout=getattr(settings, 'LISTING_STALE_TIMEOUT', 600),
+        background=True,
+    )
+
+
+def _build_events(at):
+    published = Event.objects.filter(is_published=True)
+    return {
+        'upcoming': list(published.filter(event_start__gte=at).order_by('event_start', 'id')),
+        'past': list(published.filter(event_end__lt=at).order_by('-event_end', 'id')),
+    }
+
+
+def event_listings():
+    """
+    Published events split into ``upcoming`` (soonest first) and ``past``
+    (most recently ended first), ties broken by id for the API cursors.
+    Returns the cache entry: ``.value`` is the dict and ``.fresh_until``
+    the timestamp of the next start or end.
+    """
+    return _listing('events', Event, _build_events, next_event_change)
+
+
+def _build_current_leaders(at):
+    today = at.date()
+    return list(
+        Leader.objects.filter(start_date__lte=today)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
+        .order_by('-year_served', 'position', 'full_name')
+    )
+
+
+def current_leaders():
+    """Leaders whose term covers today, as a cache entry like event_listings()."""
+    return _listing('current_leaders', Leader, _build_current_leaders, next_leader_change)
@@ -0,0 +1,133 @@
+import pickle
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from kuai_club.models import Event, Project
+from kuai_club.views import EVENT_SERIALIZER, PROJECT_SERIALIZER
+
+DESCRIPTION = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 40
+
+
+def _project_json(project):
+    # The per-instance payload api_projects built before kuai_club.serializers
+    return {
+        "id": project.id,
+        "title": project.title,
+        "summary": project.summary,
+        "image_url": project.image.url if project.image else "",
+        "publish_date": project.publish_date.isoformat() if project.publish_date else "",
+        "url": project.url or "",
+    }
+
+
+def _event_json(event):
+    return {
+        "id": event.id,
+        "title": event.title,
+        "summary": event.summary,
+        "event_url": event.event_url,
+        "image_url": event.image.url if event.image else "",
+        "event_start": event.event_start.isoformat() if event.event_start else "",
+        "event_end": event.event_end.isoformat() if event.event_end else "",
+    }
+
+
+def _best(func, repeat, setup=lambda: None):
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        started = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+class Command(BaseCommand):
+    help = 'Time the API payloads per 1,000 rows: model instances against values() rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Number of projects and events to serialize (default: 1000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs of each case; the fastest counts (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        # Sample rows only live inside this transaction
+        with transaction.atomic():
+            self._create_rows(rows)
+            results = self._run(rows, repeat)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{rows} rows, best of {repeat}, ms per 1,000 rows:")
+        for name, before, after in results:
+            self.stdout.write(
+                f"  {name:<28} before {before * 1000 / rows * 1000:8.2f}  "
+                f"after {after * 1000 / rows * 1000:8.2f}  ({before / after:.1f}x)"
+            )
+
+    def _create_rows(self, rows):
+        start = now()
+        Project.objects.bulk_create(
+            Project(
+                title=f'Benchmark project {i}',
+                slug=f'benchmark-project-{i}',
+                summary='A short summary of the project.',
+                description=DESCRIPTION,
+                image=f'project_images/benchmark {i}.jpg' if i % 4 else '',
+                url='https://example.com/' if i % 2 else None,
+            )
+            for i in range(rows)
+        )
+        Event.objects.bulk_create(
+            Event(
+                title=f'Benchmark event {i}',
+                slug=f'benchmark-event-{i}',
+                summary='A short summary of the event.',
+                description=DESCRIPTION,
+                image=f'event_images/benchmark {i}.jpg' if i % 4 else '',
+                event_start=start,
+                event_end=start,
+            )
+            for i in range(rows)
+        )
+
+    def _run(self, rows, repeat):
+        projects = Project.objects.filter(is_published=True).order_by('-publish_date', 'id')[:rows]
+
+        def projects_before(_):
+            return [_project_json(project) for project in projects.all()]
+
+        def projects_after(_):
+            return PROJECT_SERIALIZER.serialize_rows(PROJECT_SERIALIZER.values(projects.all()))
+
+        # api_events pages through instances of the cached listing, which
+        # each request unpickles afresh (untimed here)
+        pickled = pickle.dumps(list(Event.objects.filter(title__startswith='Benchmark event ')[:rows]))
+
+        def events_before(events):
+            return [_event_json(event) for event in events]
+
+        def events_after(events):
+            return EVENT_SERIALIZER.serialize_objects(events)
+
+        def unpickle():
+            return pickle.loads(pickled)
+
+        assert projects_before(None) == projects_after(None)
+        assert events_before(unpickle()) == events_after(unpickle())
+        return [
+            ('api_projects (query + JSON)', _best(projects_before, repeat), _best(projects_after, repeat)),
+            ('api_events (cached list)', _best(events_before, repeat, unpickle), _best(events_after, repeat, unpickle)),
+        ]
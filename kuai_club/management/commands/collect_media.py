@@ -0,0 +1,46 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from kuai_club.media import referenced_field_names
+from kuai_club.media_gc import live_names, orphaned_files, remove_empty_dirs, stale_assets
+
+
+class Command(BaseCommand):
+    help = 'Report, or delete, media files that no model field or processed image refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the unreferenced files and stale MediaAssets (default: only report them)',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help='Leave files modified in the last N minutes alone, e.g. uploads in flight (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        field_names = referenced_field_names()
+        stale = stale_assets(field_names)
+        live = live_names(field_names, stale)
+        self.stdout.write(f"{len(field_names)} files referenced by fields, {len(live)} names in use, {len(stale)} stale assets")
+
+        count = size = 0
+        for orphan in orphaned_files(live, min_age=options['min_age'] * 60):
+            count += 1
+            size += orphan.size
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {orphan.name}  {orphan.size / 1024:.0f} KB")
+            if options['delete']:
+                default_storage.delete(orphan.name)
+
+        total = f"{count} unreferenced files, {size / 1024 / 1024:.1f} MB"
+        if not options['delete']:
+            self.stdout.write(f"{total}; pass --delete to remove them")
+            return
+        for asset in stale:
+            asset.delete()
+        remove_empty_dirs()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} and {len(stale)} stale assets"))
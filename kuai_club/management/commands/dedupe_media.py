@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from kuai_club.dedupe import apply_dedupe, plan_dedupe, reclaimable_bytes
+from kuai_club.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads into content-addressed storage, collapsing duplicate files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Move the files and update the database (default: only report what would change)',
+        )
+        parser.add_argument(
+            '--keep-originals',
+            action='store_true',
+            help='Leave the old files on disk after repointing the database',
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not kuai_club.storage.ContentAddressedStorage')
+
+        plan = plan_dedupe()
+        for name in plan.missing:
+            self.stdout.write(self.style.WARNING(f"  missing: {name}"))
+
+        groups = defaultdict(list)
+        for old, new in plan.moves.items():
+            groups[new].append(old)
+        if options['verbosity'] > 1:
+            for new, olds in sorted(groups.items()):
+                self.stdout.write(f"  {new}")
+                for old in olds:
+                    self.stdout.write(f"      <- {old}")
+
+        freed = reclaimable_bytes(plan.moves)
+        self.stdout.write(
+            f"{len(plan.moves)} files to move into {len(groups)} blobs, "
+            f"{len(plan.moves) - len(groups)} duplicates, {freed / 1024 / 1024:.1f} MB to reclaim"
+        )
+        if not options['apply']:
+            self.stdout.write("Dry run: pass --apply to move the files")
+            return
+        if not plan.moves:
+            return
+
+        changed = apply_dedupe(plan.moves, delete=not options['keep_originals'])
+        labels = ', '.join(sorted(model._meta.label for model in changed))
+        self.stdout.write(self.style.SUCCESS(f"Moved {len(plan.moves)} files; updated {labels or 'no models'}"))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from kuai_club.image_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run the image processing worker: resize queued uploads in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no job is runnable instead of waiting for new ones',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Stop after this many jobs (default: no limit)',
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        while not options['limit'] or processed < options['limit']:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            started = time.perf_counter()
+            ok = run_job(job)
+            processed += 1
+            elapsed = (time.perf_counter() - started) * 1000
+            line = f"  {job}  {elapsed:.0f} ms"
+            if ok:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  attempt {job.attempts}: {job.last_error}"))
+
+        self.stdout.write(f"Processed {processed} jobs, {failed} failed")
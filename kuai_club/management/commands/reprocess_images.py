@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from kuai_club.reprocess import Checkpoint, init_worker, plan_reprocess, record, render_task
+
+
+def _mb(size):
+    return size / 1024 / 1024
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the resized copies, variants and encodings of every uploaded image in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: one per CPU core)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Render every image again, not only those made with other settings or unfinished',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many images, and how many MB of uploads, would be processed',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, 'reprocess_images.checkpoint'),
+            help='File recording finished images, so an interrupted run resumes (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of an earlier run',
+        )
+
+    def handle(self, *args, **options):
+        plan = plan_reprocess(force=options['force'])
+        checkpoint = Checkpoint(options['checkpoint'])
+        if options['restart']:
+            checkpoint.clear()
+        done = checkpoint.load()
+        tasks = [task for task in plan.tasks if task.key not in done]
+
+        for name in plan.missing:
+            self.stdout.write(self.style.WARNING(f"  missing: {name}"))
+        for field, uploads in plan.skipped:
+            self.stdout.write(self.style.WARNING(f"  skipped: {field} has no IMAGE_SPECS entry ({uploads} uploads)"))
+        source_bytes = sum(task.source_bytes for task in tasks)
+        self.stdout.write(
+            f"{len(tasks)} images to process ({_mb(source_bytes):.1f} MB of uploads) for "
+            f"{sum(len(task.fields) for task in tasks)} fields; {plan.up_to_date} up to date, "
+            f"{len(plan.tasks) - len(tasks)} done in an earlier run, {len(plan.missing)} missing, "
+            f"{len(plan.skipped)} image fields without a spec skipped"
+        )
+        if options['dry_run']:
+            if options['verbosity'] > 1:
+                for task in tasks:
+                    self.stdout.write(f"  {task.model_label}.{task.field_name}  {task.source}  {_mb(task.source_bytes):.2f} MB")
+            return
+        if not tasks:
+            checkpoint.clear()
+            return
+
+        workers = max(1, min(options['workers'], len(tasks)))
+        self.stdout.write(f"Processing with {workers} workers")
+        started = time.perf_counter()
+        if workers == 1:
+            processed, failed, saved = self._collect(map(render_task, tasks), checkpoint)
+        else:
+            # Workers never use the database; don't let them inherit our connection
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+                processed, failed, saved = self._collect(pool.imap_unordered(render_task, tasks), checkpoint)
+        elapsed = time.perf_counter() - started
+
+        summary = (
+            f"Processed {processed} images in {elapsed:.1f} s ({processed / elapsed:.2f} images/s), "
+            f"{_mb(saved):.1f} MB saved against the uploads, {failed} failed"
+        )
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
+        if not failed:
+            checkpoint.clear()
+
+    def _collect(self, results, checkpoint):
+        processed = failed = saved = 0
+        for task, fields, error, seconds in results:
+            line = f"  {task.model_label}.{task.field_name}  {task.source}  {seconds * 1000:.0f} ms"
+            if error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  {error}"))
+                continue
+            record(task, fields)
+            checkpoint.add(task.key)
+            processed += 1
+            saved += task.source_bytes - fields['bytes']
+            self.stdout.write(f"{line}  {_mb(fields['bytes']):.2f} MB")
+        return processed, failed, saved
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from kuai_club.warmup import WARM_URLS, default_host, warm_caches
+
+
+class Command(BaseCommand):
+    help = 'Prefill the layout, page and API caches after a deploy or restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of parallel worker threads (default: 4)',
+        )
+        parser.add_argument(
+            '--host',
+            default=None,
+            help='Host header for the warm-up requests (default: first ALLOWED_HOSTS entry or localhost)',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='Warm only this URL (repeatable); defaults to the built-in list',
+        )
+
+    def handle(self, *args, **options):
+        host = options['host'] or default_host()
+        urls = options['urls'] or WARM_URLS
+        self.stdout.write(f"Warming {len(urls) + 1} keys with {options['workers']} workers (host: {host})")
+
+        results = warm_caches(urls=urls, workers=options['workers'], host=host)
+
+        width = max(len(result['key']) for result in results)
+        for result in results:
+            line = f"  {result['key']:<{width}}  {result['ms']:8.1f} ms  {result['status']}"
+            self.stdout.write(self.style.SUCCESS(line) if result['ok'] else self.style.ERROR(line))
+
+        failed = sum(not result['ok'] for result in results)
+        total_ms = sum(result['ms'] for result in results)
+        summary = f"Done: {len(results)} keys, {failed} failed, {total_ms:.1f} ms of work"
+        self.stdout.write(self.style.WARNING(summary) if failed else self.style.SUCCESS(summary))
@@ -0,0 +1,166 @@
+"""
+Read side of the processed images: size, format, dominant color and
+responsive variants by image URL, and the choice between a file and its
+WebP/AVIF siblings.
+
+One cached MediaIndex maps the URL of every processed upload, and of its
+resized copy, to a MediaInfo, so templates can emit width/height and a
+srcset from an ImageFieldFile or a cached ImageRef without a query or a
+file open per image. It is dropped whenever a MediaAsset changes
+(kuai_club.signals).
+
+The same upload can be processed with several specs when fields with
+different IMAGE_SPECS hold it, each giving its own variants, so entries
+are keyed by URL and spec and looked up with the spec of the field
+showing the image (field_spec()).
+
+Templates always link the JPEG/PNG file. The process_images worker stores
+``<name>.avif`` and ``<name>.webp`` next to it, and negotiate_media() picks
+the best one the browser accepts, so old browsers still get the JPEG.
+"""
+import os
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import FileField
+from django.utils._os import safe_join
+
+from .cache_backends import get_or_compute
+from .images import spec_key
+from .models import MediaAsset
+
+MEDIA_INFO_KEY = 'media_info:v2'
+
+# What the pages show at a URL, as recorded by the process_images worker.
+# variants: ``[(width, url), ...]`` narrowest first. placeholder: a data:
+# URI. Only the variants and the looks are known for the URL of an upload
+# that was replaced by a resized copy.
+MediaInfo = namedtuple('MediaInfo', 'width height format bytes dominant_color placeholder variants')
+
+# Best first
+ALTERNATE_MEDIA_TYPES = [('.avif', 'image/avif'), ('.webp', 'image/webp')]
+NEGOTIABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+def file_fields():
+    """Yield ``(model, field)`` for every FileField/ImageField of every installed model."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField):
+                yield model, field
+
+
+def referenced_field_names():
+    """Every storage name held by a FileField/ImageField row."""
+    names = set()
+    for model, field in file_fields():
+        names.update(
+            model._base_manager.exclude(**{field.attname: ''})
+            .exclude(**{f'{field.attname}__isnull': True})
+            .values_list(field.attname, flat=True)
+            .distinct()
+        )
+    return names
+
+
+def sibling_names(name):
+    """Names of the alternate encodings the worker may store next to ``name``."""
+    return [name + ext for ext, _ in ALTERNATE_MEDIA_TYPES]
+
+
+class MediaIndex:
+    """MediaInfo by URL and by the spec of the field showing it."""
+
+    def __init__(self):
+        self._by_spec = {}
+        self._by_url = {}
+
+    def add(self, url, spec, info):
+        if spec:
+            self._by_spec[url, spec] = info
+        # Without a spec, prefer what describes the file itself over the
+        # looks of an upload some other spec replaced with a copy
+        if url not in self._by_url or info.width is not None:
+            self._by_url[url] = info
+
+    def get(self, url, spec=None):
+        """The MediaInfo of ``url`` as processed with ``spec`` (an ImageSpec), or None."""
+        if spec is not None:
+            info = self._by_spec.get((url, spec_key(spec)))
+            if info is not None:
+                return info
+        return self._by_url.get(url)
+
+
+def field_spec(image):
+    """The ImageSpec of the field holding ``image`` (a FieldFile or an ImageRef), or None."""
+    field = getattr(image, 'field', None)
+    if field is None:
+        return getattr(image, 'spec', None)
+    return (getattr(field.model, 'IMAGE_SPECS', None) or {}).get(field.name)
+
+
+def build_media_info():
+    index = MediaIndex()
+    rows = MediaAsset.objects.values_list(
+        'source', 'derivative', 'spec', 'variants',
+        'width', 'height', 'format', 'bytes', 'dominant_color', 'placeholder',
+    )
+    for source, derivative, spec, variants, *metadata in rows:
+        urls = [(width, default_storage.url(name)) for width, name in variants]
+        info = MediaInfo(*metadata, urls)
+        if derivative:
+            index.add(default_storage.url(derivative), spec, info)
+            info = info._replace(width=None, height=None, format='', bytes=None)
+        index.add(default_storage.url(source), spec, info)
+    return index
+
+
+def get_media_info():
+    return get_or_compute(MEDIA_INFO_KEY, build_media_info)
+
+
+def srcset(variants):
+    return ', '.join(f'{url} {width}w' for width, url in variants)
+
+
+def _accepted_types(accept):
+    """Media types listed in an Accept header, minus those refused with q=0."""
+    accepted = set()
+    for item in accept.split(','):
+        media_type, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+    return accepted
+
+
+def negotiate_media(path, accept):
+    """
+    Return ``(path, content_type)`` of the best encoding of the media file
+    at ``path`` for a request sending ``accept``; content_type is None for
+    the file itself.
+    """
+    if os.path.splitext(path)[1].lower() not in NEGOTIABLE_EXTENSIONS:
+        return path, None
+    accepted = _accepted_types(accept)
+    for ext, media_type in ALTERNATE_MEDIA_TYPES:
+        # Browsers list image formats explicitly; */* alone doesn't count
+        if media_type not in accepted:
+            continue
+        try:
+            if os.path.exists(safe_join(settings.MEDIA_ROOT, path + ext)):
+                return path + ext, media_type
+        except SuspiciousFileOperation:
+            break
+    return path, None
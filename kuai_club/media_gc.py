@@ -0,0 +1,96 @@
+"""
+Garbage collection of media files nothing refers to any more.
+
+Replacing an image in the admin leaves the old upload behind, and
+reprocessing leaves the copies made with the old settings. The index of
+live names holds every file referenced by a FileField/ImageField of either
+app, by a queued ImageJob, or by a live MediaAsset (its upload, resized
+copy and variants), each with its WebP/AVIF siblings. A MediaAsset is stale
+when no field shows its upload or copy any more, or when a newer asset
+made the same copy. orphaned_files() then walks MEDIA_ROOT with
+os.scandir, one directory at a time, and yields whatever isn't in the
+index. Used by the ``collect_media`` management command.
+"""
+import os
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .media import referenced_field_names, sibling_names
+from .models import ImageJob, MediaAsset
+
+Orphan = namedtuple('Orphan', 'name path size')
+
+
+def stale_assets(field_names):
+    """MediaAssets whose files no field shows, or superseded by a newer asset with the same copy."""
+    stale, seen_derivatives = [], set()
+    for asset in MediaAsset.objects.order_by('-updated_at', '-pk'):
+        shown = asset.derivative in field_names or asset.source in field_names
+        if not shown or (asset.derivative and asset.derivative in seen_derivatives):
+            stale.append(asset)
+        elif asset.derivative:
+            seen_derivatives.add(asset.derivative)
+    return stale
+
+
+def live_names(field_names, stale):
+    """The index: every name still in use, with its alternate encodings."""
+    names = set(field_names)
+    pending = ImageJob.objects.filter(Q(status=ImageJob.PENDING) | Q(status=ImageJob.RUNNING))
+    names.update(pending.values_list('source', flat=True))
+    stale_pks = {asset.pk for asset in stale}
+    for pk, source, derivative, variants in MediaAsset.objects.values_list('pk', 'source', 'derivative', 'variants'):
+        if pk in stale_pks:
+            continue
+        names.add(source)
+        if derivative:
+            names.add(derivative)
+        names.update(name for _, name in variants)
+    for name in list(names):
+        names.update(sibling_names(name))
+    return names
+
+
+def _walk(root, prefix=''):
+    # Depth first, holding one directory iterator per level
+    with os.scandir(os.path.join(root, prefix)) as entries:
+        for entry in entries:
+            name = f'{prefix}{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(root, f'{name}/')
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry
+
+
+def orphaned_files(live, root=None, min_age=3600):
+    """
+    Yield an Orphan for each file under ``root`` (MEDIA_ROOT) that isn't in
+    ``live`` and wasn't modified in the last ``min_age`` seconds, so an
+    upload whose row isn't saved yet is never taken for garbage.
+    """
+    root = str(root or settings.MEDIA_ROOT)
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - min_age
+    for name, entry in _walk(root):
+        if name in live:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            continue
+        yield Orphan(name, entry.path, stat.st_size)
+
+
+def remove_empty_dirs(root=None):
+    """Delete the directories under ``root`` left empty, deepest first."""
+    root = str(root or settings.MEDIA_ROOT)
+    for directory, _, _ in os.walk(root, topdown=False):
+        if directory == root:
+            continue
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # not empty
@@ -0,0 +1,12 @@
+from .site_data import SiteData
+
+
+class SiteDataMiddleware:
+    """Attach the request-scoped data access layer as ``request.site_data``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.site_data = SiteData(request)
+        return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0005_mediaasset_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='variants',
+            field=models.JSONField(blank=True, default=list, help_text='[width, storage name] pairs for srcset, narrowest first'),
+        ),
+    ]
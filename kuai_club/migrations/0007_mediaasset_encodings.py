@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0006_mediaasset_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='encodings',
+            field=models.JSONField(blank=True, default=list, help_text='Alternate formats stored next to each file, e.g. ["avif", "webp"]'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0007_mediaasset_encodings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='dominant_color',
+            field=models.CharField(blank=True, help_text='Hex color, e.g. #336699', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='format',
+            field=models.CharField(blank=True, help_text='Pillow format name, e.g. JPEG', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
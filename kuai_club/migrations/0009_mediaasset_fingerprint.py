@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0008_mediaasset_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text="Hash of the upload's content and the processing settings; empty for assets made before it existed", max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='source',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0009_mediaasset_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='placeholder',
+            field=models.TextField(blank=True, help_text='Tiny blurred JPEG as a data: URI, shown while the image loads'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0010_mediaasset_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_published', '-publish_date', 'id'], name='kuai_club_p_is_publ_770d87_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0011_project_publish_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leader',
+            index=models.Index(fields=['category', '-year_served'], name='kuai_club_l_categor_044f91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='research',
+            index=models.Index(fields=['category'], name='kuai_club_r_categor_d99e74_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['resource_type'], name='kuai_club_r_resourc_f3627f_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kuai_club', '0013_version_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='spec',
+            field=models.CharField(blank=True, help_text='The ImageSpec it was made with (images.spec_key); empty for assets made before it was recorded', max_length=100),
+        ),
+    ]
@@ -4,7 +4,7 @@ from django.utils.text import slugify # Import slugify
 from datetime import date
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
-from PIL import Image
+from .images import ImageSpec
 
 
 
@@ -80,6 +80,15 @@ class SiteSettings(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs). The
+    # favicon is served as uploaded: an .ico holds several sizes and a copy
+    # would keep only one.
+    IMAGE_SPECS = {
+        'background_image': ImageSpec((1920, 1080)),
+        'logo': ImageSpec((400, 400)),
+        'maintenance_image': ImageSpec((1920, 1080)),
+    }
+
     class Meta:
         verbose_name = "Site Settings"
         verbose_name_plural = "Site Settings"
@@ -107,12 +116,10 @@ from django.utils.text import slugify
 from django.db import models
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
-from PIL import Image
 
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
-from PIL import Image
 class Aboutus(models.Model):
     """Singleton model for the About Us page content."""
     title = models.CharField(max_length=100, default="About Us")
@@ -151,6 +158,12 @@ class Aboutus(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {
+        field: ImageSpec((800, 600))
+        for field in ('image', 'mission_image', 'vision_image', 'who_we_are_image')
+    }
+
     class Meta:
         verbose_name = "About Us"
         verbose_name_plural = "About Us"
@@ -164,17 +177,6 @@ class Aboutus(models.Model):
 
         super().save(*args, **kwargs)
 
-        max_width, max_height = 800, 600
-        for image_field in [self.image, self.mission_image, self.vision_image, self.who_we_are_image]:
-            if image_field and hasattr(image_field, 'path'):
-                try:
-                    img = Image.open(image_field.path)
-                    if img.width > max_width or img.height > max_height:
-                        img.thumbnail((max_width, max_height))
-                        img.save(image_field.path)
-                except Exception:
-                    pass
-
     @classmethod
     def get_instance(cls):
         return cls.objects.get_or_create(pk=1)[0]
@@ -185,7 +187,6 @@ class Aboutus(models.Model):
 
 
 from django.db import models
-from PIL import Image
 from datetime import timedelta
 from django.utils.timezone import now, timezone
 from django.utils import timezone  # ✅ correct
@@ -225,10 +226,15 @@ class Leader(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'photo': ImageSpec((800, 600), quality=85)}
+
     class Meta:
         verbose_name = "Leader"
         verbose_name_plural = "Leaders"
         ordering = ['-year_served', 'full_name']
+        # Filter of the content API (kuai_club.content_api)
+        indexes = [models.Index(fields=['category', '-year_served'])]
     
     def save(self, *args, **kwargs):
         # Auto-set end_date if not provided (6 months from start)
@@ -236,17 +242,6 @@ class Leader(models.Model):
             self.end_date = self.start_date + timedelta(days=180)
         
         super().save(*args, **kwargs)
-        
-        # Resize image if too large
-        if self.photo and hasattr(self.photo, 'path') and os.path.exists(self.photo.path):
-            max_width, max_height = 800, 600
-            try:
-                img = Image.open(self.photo.path)
-                if img.width > max_width or img.height > max_height:
-                    img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                    img.save(self.photo.path, optimize=True, quality=85)
-            except Exception as e:
-                print(f"Error resizing image: {e}")
     
     def __str__(self):
         return f"{self.full_name} - {self.position} ({self.year_served})"
@@ -287,6 +282,12 @@ class News(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {
+        'image': ImageSpec((800, 600)),
+        'background_image': ImageSpec((1920, 1080)),
+    }
+
     class Meta:
         verbose_name = "News"
         verbose_name_plural = "News"
@@ -304,20 +305,6 @@ class News(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Resize the main image
-        if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 600 or img.width > 800:
-                img = img.resize((800, 600))  # Resize to 800x600
-                img.save(self.image.path)
-
-        # Resize the background image
-        if self.background_image:
-            bg = Image.open(self.background_image.path)
-            if bg.height > 1080 or bg.width > 1920:
-                bg = bg.resize((1920, 1080))  # Resize to 1920x1080
-                bg.save(self.background_image.path)
-
 
 
 
@@ -328,7 +315,6 @@ class News(models.Model):
 from django.db import models
 from django.utils.text import slugify
 from django.utils.timezone import now
-from PIL import Image
 
 class Event(models.Model):
     title = models.CharField(max_length=150, unique=True)
@@ -345,6 +331,12 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {
+        'background_image': ImageSpec((800, 600)),
+        'image': ImageSpec((800, 600)),
+    }
+
     class Meta:
         verbose_name = "Event"
         verbose_name_plural = "Events"
@@ -360,17 +352,6 @@ class Event(models.Model):
             self.event_start = now()
         super().save(*args, **kwargs)
 
-        # Resize images if they exist
-        max_width = 800
-        max_height = 600
-
-        for img_field in [self.background_image, self.image]:
-            if img_field and img_field.path:
-                img = Image.open(img_field.path)
-                if img.width > max_width or img.height > max_height:
-                    img.thumbnail((max_width, max_height))
-                    img.save(img_field.path)
-
     def is_upcoming(self):
         return self.event_start and self.event_start >= now()
 
@@ -415,10 +396,15 @@ class Research(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec((800, 600))}
+
     class Meta:
         verbose_name = "Research"
         verbose_name_plural = "Research"
         ordering = ['-publish_date', '-created_at']
+        # Filter of the content API (kuai_club.content_api)
+        indexes = [models.Index(fields=['category'])]
 
     def __str__(self):
         return self.title
@@ -458,6 +444,8 @@ class Resource(models.Model):
     class Meta:
         verbose_name = "Resource"
         verbose_name_plural = "Resources"
+        # Filter of the content API (kuai_club.content_api)
+        indexes = [models.Index(fields=['resource_type'])]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -493,7 +481,6 @@ class CommunityOutreach(models.Model):
 # Projects
 # ===========================
 from django.utils.text import slugify
-from PIL import Image
 import os
 
 class Project(models.Model):
@@ -518,29 +505,21 @@ class Project(models.Model):
     collaborators = models.TextField(blank=True, null=True, help_text="External collaborators or partner organizations")
     total_people_involved = models.PositiveIntegerField(default=0, help_text="Total number of people involved in this project")
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec((800, 600))}
+
     class Meta:
         verbose_name = "Project"
         verbose_name_plural = "Projects"
         ordering = ['-publish_date', '-created_at']
+        # Cursor pages of api_projects: a range scan on (publish_date, id)
+        indexes = [models.Index(fields=['is_published', '-publish_date', 'id'])]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
         
         super().save(*args, **kwargs)
-        
-        # Resize image after saving
-        if self.image:
-            img_path = self.image.path
-            img = Image.open(img_path)
-            
-            max_width = 800
-            max_height = 600
-            
-            # Only resize if larger than max dimensions
-            if img.width > max_width or img.height > max_height:
-                img.thumbnail((max_width, max_height))
-                img.save(img_path)
 
     def get_team_members_list(self):
         """Return team members as a list"""
@@ -566,7 +545,6 @@ class Project(models.Model):
 
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from PIL import Image  # Pillow library
 import os
 
 class HeroSlide(models.Model):
@@ -583,6 +561,9 @@ class HeroSlide(models.Model):
     is_active = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
 
+    # Resized and re-encoded by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec((1920, 800), format='JPEG', quality=85)}
+
     class Meta:
         ordering = ['order']
         verbose_name = _('Hero Slide')
@@ -591,22 +572,6 @@ class HeroSlide(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.image:
-            image_path = self.image.path
-            try:
-                img = Image.open(image_path)
-
-                # Resize while maintaining aspect ratio
-                max_size = (1920, 800)
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-                # Save optimized image
-                img.save(image_path, format='JPEG', quality=85)
-            except Exception as e:
-                print(f"Error resizing image: {e}")
 
 
 
@@ -618,7 +583,6 @@ class HeroSlide(models.Model):
 
 
 from django.db import models
-from PIL import Image
 
 class GalleryImage(models.Model):
     title = models.CharField(max_length=100, blank=True)
@@ -626,24 +590,15 @@ class GalleryImage(models.Model):
     caption = models.CharField(max_length=255, blank=True)
     upload_date = models.DateField(auto_now_add=True)
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec((1280, 960))}
+
     class Meta:
         ordering = ['-upload_date', '-id']
 
     def __str__(self):
         return self.title or f"Image {self.id}"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        # Resize image if necessary
-        if self.image:
-            img = Image.open(self.image.path)
-            max_width = 1280
-            max_height = 960
-
-            if img.height > max_height or img.width > max_width:
-                img.thumbnail((max_width, max_height))
-                img.save(self.image.path)
 
 
 
@@ -668,7 +623,6 @@ class GalleryImage(models.Model):
 
 # 3. Partners/Affiliations
 from django.db import models
-from PIL import Image
 import os
 
 class Partner(models.Model):
@@ -688,6 +642,9 @@ class Partner(models.Model):
     is_active = models.BooleanField(default=True)
     display_order = models.IntegerField(default=0, help_text="Lower numbers appear first on the page.")
 
+    # Resized by the process_images worker (kuai_club.image_jobs)
+    IMAGE_SPECS = {'image': ImageSpec((150, 150), exact=True)}
+
     class Meta:
         ordering = ['display_order', 'name']
         verbose_name_plural = "Partners"
@@ -695,15 +652,6 @@ class Partner(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.image:
-            image_path = self.image.path
-            img = Image.open(image_path)
-            img = img.convert('RGB')
-            img = img.resize((150, 150), Image.Resampling.LANCZOS)
-            img.save(image_path)
 
 
 from django.db import models
@@ -731,3 +679,78 @@ class ContactInfo(models.Model):
     def __str__(self):
         return "Contact Information"
 
+
+
+# ===========================
+# Image processing queue
+# ===========================
+from django.contrib.contenttypes.models import ContentType
+
+
+class ImageJob(models.Model):
+    """One image field of one row waiting for the process_images worker."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=100)
+    source = models.CharField(max_length=255, help_text="Storage name of the uploaded file")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.content_type.model}#{self.object_id}.{self.field_name} ({self.status})"
+
+
+class MediaAsset(models.Model):
+    """An uploaded image and the resized copy pages show instead of it."""
+    source = models.CharField(max_length=255, db_index=True)
+    fingerprint = models.CharField(
+        max_length=64, unique=True, null=True, blank=True,
+        help_text="Hash of the upload's content and the processing settings; empty for assets made before it existed",
+    )
+    derivative = models.CharField(max_length=255, blank=True, db_index=True, help_text="Empty when the upload is shown as is")
+    spec = models.CharField(
+        max_length=100, blank=True,
+        help_text="The ImageSpec it was made with (images.spec_key); empty for assets made before it was recorded",
+    )
+    variants = models.JSONField(default=list, blank=True, help_text="[width, storage name] pairs for srcset, narrowest first")
+    encodings = models.JSONField(default=list, blank=True, help_text="Alternate formats stored next to each file, e.g. [\"avif\", \"webp\"]")
+    # Of the file pages show: the resized copy, or the upload when shown as is
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True, help_text="Pillow format name, e.g. JPEG")
+    bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    dominant_color = models.CharField(max_length=7, blank=True, help_text="Hex color, e.g. #336699")
+    placeholder = models.TextField(blank=True, help_text="Tiny blurred JPEG as a data: URI, shown while the image loads")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.source
+
+
+class VersionCounter(models.Model):
+    """A content version counter (kuai_club.versioning); the cache holds a copy."""
+    key = models.CharField(max_length=200, primary_key=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
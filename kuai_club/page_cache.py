@@ -0,0 +1,92 @@
+"""
+Full-response cache for public pages viewed anonymously.
+
+Cached pages are keyed by path and the global content version, so any
+publish in either app makes every cached page stale at once. A cached page
+is only served to, and only built from, anonymous GET/HEAD requests with no
+query string and no pending flash messages. A page showing a listing that
+depends on the clock (kuai_club.listings) is only cached until that
+listing's next boundary.
+
+Pages containing a form still work: while a page is being built for the
+cache, the ``page_cache_csrf`` context processor swaps the CSRF token for a
+fixed placeholder, and every response (hit or miss) gets the placeholder
+replaced with the visitor's own token.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .versioning import get_content_version
+
+CSRF_PLACEHOLDER = 'PAGECACHECSRFTOKENPLACEHOLDER'
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.GET
+        and not request.user.is_authenticated
+        and not len(get_messages(request))  # len() does not consume them
+    )
+
+
+def _page_key(request):
+    path = hashlib.md5(request.path.encode()).hexdigest()
+    return f'page:{get_content_version()}:{path}'
+
+
+def _page_timeout(request):
+    """PAGE_CACHE_TIMEOUT, cut short if the page shows a listing that changes sooner."""
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+    site_data = getattr(request, 'site_data', None)
+    if site_data is not None and site_data.fresh_until is not None:
+        # Zero or less when a stale listing was served: don't cache the page
+        timeout = min(timeout, int(site_data.fresh_until - time.time()))
+    return timeout
+
+
+def _with_csrf_token(request, content):
+    if CSRF_PLACEHOLDER.encode() not in content:
+        return content
+    return content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+
+
+def cache_anonymous_page(view_func):
+    """Serve ``view_func`` from the full-page cache for anonymous visitors."""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = _page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(_with_csrf_token(request, content), content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        request.page_cache_build = True
+        response = view_func(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        request.page_cache_build = False
+
+        if response.streaming:
+            return response
+        timeout = _page_timeout(request)
+        if response.status_code == 200 and not response.cookies and timeout > 0:
+            cache.set(key, (response.content, response['Content-Type']), timeout)
+            response['X-Page-Cache'] = 'miss'
+        response.content = _with_csrf_token(request, response.content)
+        return response
+
+    return wrapper
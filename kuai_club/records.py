@@ -0,0 +1,185 @@
+"""Compact rows for cached navbar and footer data.
+
+The context processors cache these instead of QuerySets so that a cache
+read unpickles a handful of short tuples rather than full model instances
+(News.content, Project.description, ...). Each record carries only the
+columns the layout templates render, and exposes ``image`` (and any other
+image field) with a ``url`` attribute so templates written against model
+instances keep working. The one-row settings, about page and contact info
+are records too.
+"""
+from collections import namedtuple
+
+from django.utils.text import Truncator
+
+from .models import Aboutus, GalleryImage, HeroSlide, News, Partner, SiteSettings
+
+
+class ImageRef:
+    """Stand-in for an ImageFieldFile that only knows its URL and its field's ImageSpec."""
+    __slots__ = ('url', 'spec')
+
+    def __init__(self, url, spec=None):
+        self.url = url
+        self.spec = spec
+
+    def __bool__(self):
+        return bool(self.url)
+
+    def __str__(self):
+        return self.url
+
+
+class _ImageRecord:
+    """
+    Mixin for records of ``model`` holding image URLs: ``image_columns``
+    maps each URL column to the image field it is read from.
+    """
+    __slots__ = ()
+    model = None
+    image_columns = {'image_url': 'image'}
+
+    def image_ref(self, column):
+        spec = (getattr(self.model, 'IMAGE_SPECS', None) or {}).get(self.image_columns[column])
+        return ImageRef(getattr(self, column), spec)
+
+    @property
+    def image(self):
+        return self.image_ref('image_url')
+
+
+def _image_property(column):
+    return property(lambda record: record.image_ref(column))
+
+
+class NewsLink(_ImageRecord, namedtuple('NewsLink', 'id title slug summary image_url')):
+    __slots__ = ()
+    model = News
+
+
+class EventLink(namedtuple('EventLink', 'id title slug')):
+    __slots__ = ()
+
+
+class ResearchLink(namedtuple('ResearchLink', 'id title')):
+    __slots__ = ()
+
+
+class ResourceLink(namedtuple('ResourceLink', 'id title resource_type')):
+    __slots__ = ()
+
+
+class CommunityLink(namedtuple('CommunityLink', 'id title url')):
+    __slots__ = ()
+
+
+class ProjectLink(namedtuple('ProjectLink', 'id title slug url')):
+    __slots__ = ()
+
+
+class HeroSlideRecord(_ImageRecord, namedtuple('HeroSlideRecord', [
+    'id', 'title', 'subtitle', 'image_url',
+    'button1_text', 'button1_url', 'button1_style',
+    'button2_text', 'button2_url', 'button2_style',
+])):
+    __slots__ = ()
+    model = HeroSlide
+
+
+class GalleryItem(_ImageRecord, namedtuple('GalleryItem', 'id title caption image_url')):
+    __slots__ = ()
+    model = GalleryImage
+
+
+class PartnerRecord(_ImageRecord, namedtuple('PartnerRecord', 'id name image_url website_link description partner_type')):
+    __slots__ = ()
+    model = Partner
+
+    @property
+    def get_partner_type_display(self):
+        return dict(Partner.PARTNER_TYPES).get(self.partner_type, self.partner_type)
+
+
+class SiteSettingsRecord(_ImageRecord, namedtuple('SiteSettingsRecord', [
+    'site_name', 'primary_color', 'secondary_color', 'quick_links',
+    'contact_email', 'contact_phone', 'favicon_url', 'background_image_url',
+    'facebook_url', 'twitter_url', 'instagram_url', 'linkedin_url', 'youtube_url', 'whatsapp_url',
+])):
+    __slots__ = ()
+    model = SiteSettings
+    image_columns = {'favicon_url': 'favicon', 'background_image_url': 'background_image'}
+    favicon = _image_property('favicon_url')
+    background_image = _image_property('background_image_url')
+
+
+class IndabaxSettingsRecord(namedtuple('IndabaxSettingsRecord', [
+    'footer_description', 'contact_email', 'phone_number', 'physical_address',
+    'facebook_url', 'twitter_url', 'linkedin_url', 'github_url', 'youtube_url',
+])):
+    __slots__ = ()
+
+
+class AboutRecord(_ImageRecord, namedtuple('AboutRecord', [
+    'id', 'content', 'image_url', 'mission', 'mission_image_url', 'vision', 'vision_image_url',
+    'who_we_are_title', 'who_we_are_description', 'who_we_are_image_url',
+    'why_exist_title', 'why_exist_description',
+])):
+    __slots__ = ()
+    model = Aboutus
+    image_columns = {
+        'image_url': 'image',
+        'mission_image_url': 'mission_image',
+        'vision_image_url': 'vision_image',
+        'who_we_are_image_url': 'who_we_are_image',
+    }
+    mission_image = _image_property('mission_image_url')
+    vision_image = _image_property('vision_image_url')
+    who_we_are_image = _image_property('who_we_are_image_url')
+
+
+class ContactRecord(namedtuple('ContactRecord', [
+    'address', 'email', 'phone', 'facebook_link', 'twitter_link', 'linkedin_link', 'instagram_link',
+])):
+    __slots__ = ()
+
+
+def materialize(queryset, record):
+    """
+    Evaluate ``queryset`` into a list of ``record`` tuples.
+
+    Only the record's columns are selected. Image URL columns (see
+    _ImageRecord) are read from their image field and resolved to URLs
+    once, at build time.
+    """
+    image_columns = {
+        column: field for column, field in getattr(record, 'image_columns', {}).items() if column in record._fields
+    }
+    columns = [image_columns.get(name, name) for name in record._fields]
+    if not image_columns:
+        return [record(*row) for row in queryset.values_list(*columns)]
+
+    storages = {
+        record._fields.index(column): queryset.model._meta.get_field(field).storage
+        for column, field in image_columns.items()
+    }
+    rows = []
+    for row in queryset.values_list(*columns):
+        row = list(row)
+        for index, storage in storages.items():
+            row[index] = storage.url(row[index]) if row[index] else ''
+        rows.append(record(*row))
+    return rows
+
+
+def materialize_first(queryset, record):
+    """The first row of ``queryset`` as a ``record``, or None."""
+    rows = materialize(queryset[:1], record)
+    return rows[0] if rows else None
+
+
+def news_links(queryset, summary_words=15):
+    """News records with the summary pre-truncated for the navbar."""
+    return [
+        item._replace(summary=Truncator(item.summary).words(summary_words))
+        for item in materialize(queryset, NewsLink)
+    ]
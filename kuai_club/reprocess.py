@@ -0,0 +1,148 @@
+"""
+Bulk reprocessing of every uploaded image, e.g. after IMAGE_SPECS or
+IMAGE_VARIANT_WIDTHS change.
+
+plan_reprocess() walks the image field of every model with IMAGE_SPECS in
+both apps, traces each resized copy back to its original upload and
+groups the fields by fingerprint, so an upload shown by several rows is
+rendered once. The ``reprocess_images`` command renders the groups in a
+process pool (render_asset() needs no database) and records each result
+from the main process, noting finished fingerprints in a checkpoint file
+so an interrupted run can resume where it stopped. Image fields without an
+ImageSpec are left alone and listed in the plan rather than passed over
+silently.
+"""
+import os
+import time
+from collections import namedtuple
+
+import django
+from django.apps import apps
+from django.db.models import ImageField
+
+from .image_jobs import find_asset, fingerprint, is_complete, render_asset, save_asset, source_digest
+from .media import file_fields
+from .models import MediaAsset
+
+# One upload to render with one spec. fields: (model label, pk, field name,
+# current name) of every field that shows it.
+ReprocessTask = namedtuple('ReprocessTask', 'key model_label field_name source derivative source_bytes fields')
+
+# skipped: ``[(field label, rows with a file), ...]`` of the image fields
+# without an ImageSpec
+ReprocessPlan = namedtuple('ReprocessPlan', 'tasks up_to_date missing skipped')
+
+
+def image_fields():
+    """Yield ``(model, field_name)`` for every image field with an ImageSpec."""
+    for model in apps.get_models():
+        for field_name in getattr(model, 'IMAGE_SPECS', None) or {}:
+            yield model, field_name
+
+
+def skipped_image_fields():
+    """Yield ``(model, field_name)`` for every ImageField without an ImageSpec."""
+    for model, field in file_fields():
+        if isinstance(field, ImageField) and field.name not in (getattr(model, 'IMAGE_SPECS', None) or {}):
+            yield model, field.name
+
+
+def _uploads(model, field_name):
+    return model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+
+
+def plan_reprocess(force=False):
+    """
+    Return a ReprocessPlan: the uploads to render, the number of fields
+    already up to date and the names with no file behind them. With
+    ``force`` every upload is rendered again from scratch.
+    """
+    source_of = dict(MediaAsset.objects.exclude(derivative='').values_list('derivative', 'source'))
+    tasks, up_to_date, missing = {}, 0, []
+    for model, field_name in image_fields():
+        spec = model.IMAGE_SPECS[field_name]
+        storage = model._meta.get_field(field_name).storage
+        for pk, name in _uploads(model, field_name).values_list('pk', field_name):
+            source = source_of.get(name, name)
+            if not storage.exists(source):
+                if not storage.exists(name):
+                    missing.append(name)
+                    continue
+                # The original upload is gone: work from the copy
+                source = name
+            key = fingerprint(source_digest(storage, source), spec)
+            field = (model._meta.label, pk, field_name, name)
+            if key in tasks:
+                tasks[key].fields.append(field)
+                continue
+            asset = find_asset(key, source)
+            if asset is not None and is_complete(asset, spec) and not force:
+                up_to_date += 1
+                continue
+            derivative = asset.derivative if asset is not None and not force else ''
+            tasks[key] = ReprocessTask(
+                key, model._meta.label, field_name, source, derivative, storage.size(source), [field],
+            )
+    skipped = [
+        (f'{model._meta.label}.{field_name}', _uploads(model, field_name).count())
+        for model, field_name in skipped_image_fields()
+    ]
+    return ReprocessPlan(list(tasks.values()), up_to_date, missing, skipped)
+
+
+def init_worker():
+    # Forked workers inherit the app registry; spawned ones start empty
+    if not apps.ready:
+        django.setup()
+
+
+def render_task(task):
+    """Pool worker: render ``task``. Returns ``(task, fields, error, seconds)``."""
+    started = time.perf_counter()
+    model = apps.get_model(task.model_label)
+    storage = model._meta.get_field(task.field_name).storage
+    try:
+        fields = render_asset(storage, task.source, model.IMAGE_SPECS[task.field_name], task.derivative)
+    except Exception as exc:
+        return task, None, f'{type(exc).__name__}: {exc}', time.perf_counter() - started
+    return task, fields, None, time.perf_counter() - started
+
+
+def record(task, fields):
+    """Save the MediaAsset rendered for ``task`` and point its fields at the file to show."""
+    from .signals import content_changed
+
+    asset = save_asset(find_asset(task.key, task.source), task.source, task.key, fields)
+    shown = asset.derivative or task.source
+    changed = set()
+    for label, pk, field_name, name in task.fields:
+        if name == shown:
+            continue
+        model = apps.get_model(label)
+        # Conditional, like process_job(): skip rows re-uploaded meanwhile
+        if model._base_manager.filter(pk=pk, **{field_name: name}).update(**{field_name: shown}):
+            changed.add(model)
+    for model in changed:
+        content_changed(model)
+    return asset
+
+
+class Checkpoint:
+    """Fingerprints of the uploads already reprocessed, one per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path) as file:
+            return {line.strip() for line in file if line.strip()}
+
+    def add(self, key):
+        with open(self.path, 'a') as file:
+            file.write(key + '\n')
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,119 @@
+"""
+Column-projecting serializers for the JSON APIs.
+
+A ValuesSerializer lists the payload keys of one model and the column each
+comes from, so the API selects only those columns with ``.values()``
+instead of loading whole rows (descriptions included) into model
+instances. Image columns become URLs by joining the storage's base URL,
+looked up once per call, with the stored name, rather than through
+``FieldFile.url`` and the storage backend for every row.
+
+Rows already loaded as instances, such as the cached event listings
+(kuai_club.listings), go through serialize_objects() with the same
+declaration. The ``benchmark_serializers`` command compares both paths
+with the old per-instance code.
+"""
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+
+
+class Column:
+    """A payload value copied from ``column`` (default: the payload key)."""
+
+    def __init__(self, column=None):
+        self.column = column
+
+    def converter(self, model):
+        """Return the function turning the raw column value into the payload value, or None to copy it."""
+        return None
+
+
+class Text(Column):
+    """A nullable string column, sent as '' when empty."""
+
+    def converter(self, model):
+        return _or_empty
+
+
+class DateTime(Column):
+    """A date, time or datetime column in ISO 8601, '' when empty."""
+
+    def converter(self, model):
+        return _isoformat
+
+
+class Media(Column):
+    """A FileField/ImageField column sent as the file's URL, '' when empty."""
+
+    def converter(self, model):
+        storage = model._meta.get_field(self.column).storage
+        if not isinstance(storage, FileSystemStorage):
+            return lambda name: storage.url(_file_name(name)) if name else ''
+        # Same URL as FileSystemStorage.url(); base_url follows MEDIA_URL
+        prefix = storage.base_url
+
+        def url(name):
+            name = _file_name(name)
+            return prefix + filepath_to_uri(name).lstrip('/') if name else ''
+
+        return url
+
+
+def _or_empty(value):
+    return value or ''
+
+
+def _isoformat(value):
+    return value.isoformat() if value else ''
+
+
+def _file_name(value):
+    # A raw column value, or the FieldFile of an instance that was accessed
+    return getattr(value, 'name', value)
+
+
+class ValuesSerializer:
+    """
+    ``ValuesSerializer(Project, id=Column(), image_url=Media('image'))``
+    serializes each row into ``{'id': ..., 'image_url': ...}``.
+    """
+
+    def __init__(self, model, **fields):
+        self.model = model
+        self.fields = fields
+        for key, field in fields.items():
+            field.column = field.column or key
+        self.columns = tuple(dict.fromkeys(field.column for field in fields.values()))
+
+    def only(self, keys):
+        """A serializer for the given subset of the payload keys, in declaration order."""
+        return ValuesSerializer(self.model, **{key: field for key, field in self.fields.items() if key in keys})
+
+    def values(self, queryset):
+        """``queryset`` reduced to the serialized columns, as dicts."""
+        return queryset.values(*self.columns)
+
+    def _plan(self):
+        return [(key, field.column, field.converter(self.model)) for key, field in self.fields.items()]
+
+    def _serialize(self, plan, row):
+        return {
+            key: row[column] if convert is None else convert(row[column])
+            for key, column, convert in plan
+        }
+
+    def serialize_rows(self, rows):
+        """Serialize the dicts of a values() queryset (or a page of it)."""
+        plan = self._plan()
+        return [self._serialize(plan, row) for row in rows]
+
+    def serialize_objects(self, objects):
+        """Serialize model instances that are already loaded."""
+        plan = self._plan()
+        payloads = []
+        for obj in objects:
+            # Raw values from __dict__, so no FieldFile is built for an image column
+            attrs = obj.__dict__
+            row = {column: attrs[column] if column in attrs else getattr(obj, column) for column in self.columns}
+            payloads.append(self._serialize(plan, row))
+        return payloads
@@ -0,0 +1,125 @@
+"""Cache invalidation for kuai_club context processors.
+
+Every model feeding a context processor is mapped to the cache keys built
+from it (mostly the single site chrome bundle). Those keys are cached
+without a timeout and dropped here whenever a row is saved or deleted, so
+admin edits show up on the next request.
+
+Any change to public content in either app also bumps the global content
+version (kuai_club.versioning) that keys the full-page cache, and that
+model's own version, which keys the layout fragment cache.
+
+All of it runs once the transaction making the change commits (at once
+outside a transaction). Run earlier, another worker could rebuild an entry
+from the rows it still sees, the old ones, and cache it under the new
+version; and a rolled back change would have bumped a version for nothing.
+
+Saving a model with IMAGE_SPECS also queues its new uploads for the
+process_images worker (kuai_club.image_jobs).
+"""
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from indabax_app.models import SiteSettings as IndabaxSiteSettings
+from . import image_jobs
+from .chrome import SITE_CHROME_KEY
+from .media import MEDIA_INFO_KEY
+from .versioning import bump_content_version, bump_model_version
+from .models import (
+    SiteSettings,
+    Aboutus,
+    News,
+    Event,
+    Research,
+    Resource,
+    CommunityOutreach,
+    Project,
+    HeroSlide,
+    GalleryImage,
+    Partner,
+    ContactInfo,
+    ClubJoinRequest,
+    ImageJob,
+    MediaAsset,
+    VersionCounter,
+)
+
+
+# Model -> cache keys built from it
+CACHE_KEYS_BY_MODEL = {
+    model: [SITE_CHROME_KEY]
+    for model in (
+        SiteSettings,
+        IndabaxSiteSettings,
+        Aboutus,
+        News,
+        Event,
+        Research,
+        Resource,
+        CommunityOutreach,
+        Project,
+        HeroSlide,
+        GalleryImage,
+        Partner,
+        ContactInfo,
+    )
+}
+CACHE_KEYS_BY_MODEL[MediaAsset] = [MEDIA_INFO_KEY]
+
+# Apps whose models are rendered on public pages
+CONTENT_APPS = {'kuai_club', 'indabax_app'}
+
+# Models in those apps that never appear on a public page
+NON_CONTENT_MODELS = {ClubJoinRequest, ImageJob, MediaAsset, VersionCounter}
+
+
+def invalidate_model_cache(model):
+    """Drop every cached value built from ``model``."""
+    keys = CACHE_KEYS_BY_MODEL.get(model)
+    if keys:
+        cache.delete_many(keys)
+
+
+def _invalidate(model):
+    invalidate_model_cache(model)
+    if model._meta.app_label in CONTENT_APPS and model not in NON_CONTENT_MODELS:
+        bump_model_version(model)
+        bump_content_version()
+
+
+def content_changed(model):
+    """
+    Invalidate everything built from ``model``, e.g. after a
+    queryset.update(), once the current transaction commits.
+    """
+    transaction.on_commit(partial(_invalidate, model))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_on_change(sender, **kwargs):
+    content_changed(sender)
+
+
+@receiver(post_save)
+def enqueue_image_jobs(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(sender, 'IMAGE_SPECS', None):
+        image_jobs.enqueue(instance)
+
+
+@receiver(m2m_changed)
+def bump_version_on_m2m_change(sender, instance, action, model, **kwargs):
+    # e.g. Session.speakers; sender is the auto-created through model, and
+    # either side of the relation may be the instance
+    if action.startswith('post_') and instance._meta.app_label in CONTENT_APPS:
+        transaction.on_commit(partial(_bump_m2m_versions, type(instance), model))
+
+
+def _bump_m2m_versions(*models):
+    for model in models:
+        bump_model_version(model)
+    bump_content_version()
@@ -0,0 +1,125 @@
+"""
+Request-scoped data access shared by views and context processors.
+
+SiteDataMiddleware attaches a SiteData instance to every request as
+``request.site_data``. Each property runs its query (or cache read) the
+first time it is used and remembers the result for the rest of the
+request, so a view and the context processors rendering its template
+never run the same logical query twice.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils.functional import cached_property
+from django.utils.timezone import now
+
+from .chrome import get_site_chrome
+from .listings import current_leaders, event_listings
+from .media import get_media_info
+from .models import (
+    News,
+    Project,
+    HeroSlide,
+    GalleryImage,
+)
+
+_NO_START = datetime.min.replace(tzinfo=dt_timezone.utc)
+
+
+class SiteData:
+
+    def __init__(self, request):
+        self.request = request
+        # Earliest time at which a clock-dependent value used by this
+        # request changes by itself (a Unix timestamp), or None
+        self.fresh_until = None
+
+    def _expires(self, entry):
+        if entry.fresh_until is not None:
+            self.fresh_until = min(self.fresh_until or entry.fresh_until, entry.fresh_until)
+        return entry.value
+
+    # --- Layout data (one cache read for all of it) ---
+
+    @cached_property
+    def chrome(self):
+        return get_site_chrome()
+
+    @property
+    def site_settings(self):
+        return self.chrome['site_settings']
+
+    @property
+    def about_page(self):
+        return self.chrome['about_page']
+
+    @property
+    def about_pages(self):
+        return self.chrome['about_pages']
+
+    @property
+    def contact_info(self):
+        return self.chrome['contact_info']
+
+    @property
+    def partners(self):
+        return self.chrome['partners']
+
+    @cached_property
+    def media_info(self):
+        return get_media_info()
+
+    # --- Time reference, fixed for the whole request ---
+
+    @cached_property
+    def now(self):
+        return now()
+
+    @cached_property
+    def today(self):
+        return self.now.date()
+
+    # --- Home page sections ---
+
+    @cached_property
+    def hero_slides(self):
+        return list(HeroSlide.objects.filter(is_active=True).order_by('order'))
+
+    @cached_property
+    def news(self):
+        return list(News.objects.all().order_by('title'))
+
+    @cached_property
+    def projects(self):
+        return list(Project.objects.all().order_by('title'))
+
+    @cached_property
+    def events(self):
+        return self._expires(event_listings())
+
+    @cached_property
+    def upcoming_events(self):
+        return self.events['upcoming'][:6]
+
+    @cached_property
+    def past_events(self):
+        past = sorted(self.events['past'], key=lambda event: event.event_start or _NO_START, reverse=True)
+        return past[:6]
+
+    @cached_property
+    def gallery_images(self):
+        return list(GalleryImage.objects.order_by('-upload_date', '-id')[:20])
+
+    @cached_property
+    def current_leaders(self):
+        return self._expires(current_leaders())
+
+    def current_leaders_in(self, category):
+        return [leader for leader in self.current_leaders if leader.category == category]
+
+
+def get_site_data(request):
+    """Return ``request.site_data``, creating it outside the middleware (tests, RequestFactory)."""
+    site_data = getattr(request, 'site_data', None)
+    if site_data is None:
+        site_data = request.site_data = SiteData(request)
+    return site_data
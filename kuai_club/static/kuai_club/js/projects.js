@@ -28,6 +28,7 @@ document.addEventListener('DOMContentLoaded', function () {
   // State management
   const state = {
     currentPage: 1,
+    nextCursor: '', // keyset cursor from the last response ('' = first page)
     loading: false,
     hasNextPage: true,
     loadedProjectIds: new Set(),
@@ -151,7 +152,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const timeoutId = setTimeout(() => controller.abort(), CONFIG.fetchTimeout);
 
     try {
-      const response = await fetch(`/api/projects/?page=${page}`, {
+      const response = await fetch(`/api/projects/?cursor=${encodeURIComponent(state.nextCursor)}`, {
         signal: controller.signal,
         headers: {
           'Accept': 'application/json',
@@ -186,6 +187,7 @@ document.addEventListener('DOMContentLoaded', function () {
         }
 
         state.hasNextPage = data.has_next;
+        state.nextCursor = data.next_cursor || '';
 
         // Recursive call optimization
         if (newProjectsAdded === 0 && state.hasNextPage && page < maxDepth) {
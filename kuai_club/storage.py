@@ -0,0 +1,62 @@
+"""
+Content-addressed storage for uploads.
+
+Every file is stored once, under the SHA-256 of its bytes:
+``blobs/<first two hex digits>/<digest><ext>``, whatever it was uploaded
+as. The same photo uploaded for an event, a gallery image and a hero slide
+is one file on disk that the three fields reference, and a name never
+changes content, so the media view lets browsers cache blobs for good.
+
+Uploads made before this backend keep their old names until the
+``dedupe_media`` command moves them into blobs.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = 'blobs'
+
+
+def file_digest(content):
+    """SHA-256 hex digest of a File, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{ext.lower()}'
+
+
+def is_blob_name(name):
+    return name.startswith(f'{BLOB_DIR}/')
+
+
+def blob_digest(name):
+    """The content digest in a blob name, or None for a file stored under any other name."""
+    if not is_blob_name(name):
+        return None
+    digest = os.path.splitext(os.path.basename(name))[0]
+    return digest if len(digest) == 64 else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names each file after its content, so identical files are stored once."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = blob_name(file_digest(content), os.path.splitext(name)[1])
+        if self.exists(name):
+            return name
+        stored = super().save(name, content, max_length=max_length)
+        if stored != name:
+            # A concurrent save of the same bytes got there first and ours
+            # was given a suffixed name: keep only theirs
+            self.delete(stored)
+        return name
@@ -0,0 +1,53 @@
+from django import template
+
+from ..fragment_cache import get_or_render
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.vary_on = vary_on
+
+    def render(self, context):
+        return get_or_render(
+            self.name.resolve(context),
+            self.models.resolve(context).split(),
+            lambda: self.nodelist.render(context),
+            vary_on=[var.resolve(context) for var in self.vary_on],
+        )
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Cache the enclosed template output until one of the listed models changes.
+
+    Usage::
+
+        {% cachefragment "footer" "kuai_club.SiteSettings kuai_club.ContactInfo" %}
+            ...
+        {% endcachefragment %}
+
+    Any further arguments are resolved and added to the key, for fragments
+    whose output also depends on the request::
+
+        {% cachefragment "navbar" "kuai_club.News" request.resolver_match.url_name %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and a space-separated list of models."
+        )
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -0,0 +1,102 @@
+from django import template
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from ..media import field_spec, get_media_info, srcset
+from ..site_data import get_site_data
+
+register = template.Library()
+
+
+def _info(context, image):
+    request = context.get('request')
+    media_info = get_site_data(request).media_info if request else get_media_info()
+    return media_info.get(image.url, field_spec(image))
+
+
+@register.simple_tag(takes_context=True)
+def media_info(context, image):
+    """
+    The MediaInfo of ``image`` (width, height, format, bytes,
+    dominant_color, variants), or None before it is processed::
+
+        {% media_info member.photo as photo %}
+        <div style="background-color: {{ photo.dominant_color|default:'#eee' }}">
+    """
+    return _info(context, image) if image else None
+
+
+@register.simple_tag(takes_context=True)
+def lqip(context, image):
+    """The placeholder of ``image`` as a data: URI, or '' before it is processed."""
+    info = _info(context, image) if image else None
+    return info.placeholder if info else ''
+
+
+@register.simple_tag(takes_context=True)
+def img_srcset(context, image, sizes='100vw', placeholder=False):
+    """
+    Emit the src, srcset, sizes, width and height attributes for an <img>.
+
+    ``image`` is an ImageFieldFile or anything with a ``url``. Until the
+    process_images worker has made the variants and measured the image
+    only src is emitted. With ``placeholder=True`` the blurred placeholder
+    is inlined as the element's background, so something shows at first
+    paint; leave it off for images with transparency::
+
+        <img {% img_srcset event.image "(max-width: 768px) 100vw, 50vw" placeholder=True %} alt="{{ event.title }}">
+    """
+    if not image:
+        return ''
+    url = image.url
+    info = _info(context, image)
+    html = format_html('src="{}"', url)
+    if info is None:
+        return html
+    if info.variants:
+        html += format_html(' srcset="{}" sizes="{}"', srcset(info.variants), sizes)
+    if info.width:
+        # Lets the browser reserve the space before the image loads
+        html += format_html(' width="{}" height="{}"', info.width, info.height)
+    if placeholder and info.placeholder:
+        html += format_html(' style="background: center / cover no-repeat {}"', _css_url(info.placeholder))
+    return html
+
+
+def _css_url(url):
+    return 'url("{}")'.format(url.replace('"', '%22').replace('<', '%3C'))
+
+
+@register.simple_tag(takes_context=True)
+def responsive_background(context, image, *selector):
+    """
+    Emit a <style> block that sets ``image`` as the background of the
+    element matched by ``selector``, choosing the variant by viewport width
+    (and pixel density). The selector parts are joined, so it can include a
+    key; don't also set background-image inline. The blurred placeholder,
+    or else the dominant color, shows until the image has loaded::
+
+        {% responsive_background slide.image ".hero-slide-" slide.pk %}
+    """
+    if not image:
+        return ''
+    # <style> content is not HTML-escaped; just never let it close the element
+    selector = ''.join(str(part) for part in selector).replace('<', '')
+    info = _info(context, image)
+    variants = (info and info.variants) or [(None, image.url)]
+
+    def layers(url):
+        # The placeholder is the bottom layer, painted until the image above it arrives
+        if info and info.placeholder:
+            return f'{_css_url(url)}, {_css_url(info.placeholder)}'
+        return _css_url(url)
+
+    color = f' background-color: {info.dominant_color};' if info and info.dominant_color else ''
+    rules = [f'{selector} {{ background-image: {layers(variants[0][1])};{color} }}']
+    for (previous_width, _), (_, url) in zip(variants, variants[1:]):
+        query = (
+            f'(min-width: {previous_width + 1}px), '
+            f'(min-resolution: 2dppx) and (min-width: {previous_width // 2 + 1}px)'
+        )
+        rules.append(f'@media {query} {{ {selector} {{ background-image: {layers(url)}; }} }}')
+    return mark_safe('<style>{}</style>'.format('\n'.join(rules)))
@@ -1,3 +1,999 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Model
+from django.template import Context, RequestContext, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from django.core.exceptions import ImproperlyConfigured
+from PIL import ExifTags, Image, features
+
+from indabax_app.models import Leader as IndabaxLeader, Session, SessionImage
+
+from . import versioning
+from .cache_backends import TwoTierCache, acquire_lock, get_or_compute, get_or_compute_until, release_lock
+from .chrome import SITE_CHROME_KEY, get_site_chrome, rebuild_site_chrome
+from .content_api import ContentResource
+from .fragment_cache import fragment_cache_stats, reset_fragment_cache_stats
+from .listings import current_leaders, event_listings, next_leader_change
+from .media import get_media_info
+from .models import (
+    ContactInfo,
+    Event,
+    GalleryImage,
+    ImageJob,
+    Leader,
+    MediaAsset,
+    News,
+    Partner,
+    Project,
+    Research,
+    SiteSettings,
+    VersionCounter,
+)
+from .page_cache import CSRF_PLACEHOLDER
+from .reprocess import skipped_image_fields
+from .serializers import Column
+from .versioning import (
+    CONTENT_VERSION_KEY,
+    bump_content_version,
+    bump_model_version,
+    get_content_version,
+    get_model_versions,
+)
+from .views import PROJECT_SERIALIZER, serve_media
+from .warmup import warm_caches
+
+# The site's caches with the shared tier in memory, so tests never read or
+# clear the .cache directory a running server uses
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'kuai_club.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'L1_MAX_ENTRIES': 500, 'L1_TIMEOUT': 5},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'kuai-tests'},
+}
+TEST_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'kuai-test-locks')
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=TEST_LOCK_DIR)
+class CacheTestCase(TestCase):
+    """TestCase on private caches, emptied before every test."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class LazyContextProcessorTests(CacheTestCase):
+    """Context processors must not hit the cache or DB until a template reads a variable."""
+
+    def setUp(self):
+        super().setUp()
+        self.research = Research.objects.create(title='Machine Learning')
+        SiteSettings.objects.create(site_name='KUAI Test')
+
+    def render(self, template_string):
+        request = RequestFactory().get('/')
+        return Template(template_string).render(RequestContext(request))
+
+    def test_untouched_variables_cost_nothing(self):
+        with mock.patch.object(cache, 'get', wraps=cache.get) as cache_get:
+            with self.assertNumQueries(0):
+                self.render('{{ request.path }}')
+        cache_get.assert_not_called()
+
+    def test_bundle_read_once_per_render(self):
+        self.render('{{ site_settings.site_name }}')  # warm the bundle
+        with mock.patch.object(cache, 'get', wraps=cache.get) as cache_get:
+            with self.assertNumQueries(0):
+                output = self.render('{{ site_settings.site_name }}{% for r in research %}{{ r.title }}{% endfor %}')
+        self.assertEqual(output, 'KUAI TestMachine Learning')
+        self.assertEqual(cache_get.call_count, 1)
+
+    def test_leaders_queried_only_when_used(self):
+        Leader.objects.create(full_name='Ada', position='President', category='student')
+        with self.assertNumQueries(0):
+            self.render('{{ request.path }}')
+        with self.assertNumQueries(1):
+            output = self.render('{% for l in leaders_student %}{{ l.full_name }}{% endfor %}{{ leaders_student|length }}')
+        self.assertEqual(output, 'Ada1')
+
+    def test_page_queries_with_warm_cache(self):
+        url = f'/research/{self.research.id}/'
+        self.client.get(url)
+        # Only the view's own Research lookup; the layout comes from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Machine Learning')
+
+    def test_json_endpoint_skips_layout(self):
+        with mock.patch('kuai_club.site_data.get_site_chrome') as get_chrome:
+            response = self.client.get('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        get_chrome.assert_not_called()
+
+
+class HomeQueryBudgetTests(CacheTestCase):
+    """The home page reads everything through request.site_data; keep it that way."""
+
+    # hero slides, news, projects, gallery, events (upcoming, past, next
+    # start/end) and current leaders (list, next term change)
+    HOME_QUERY_BUDGET = 9
+
+    def setUp(self):
+        super().setUp()
+        SiteSettings.objects.create(site_name='KUAI Test')
+        Research.objects.create(title='Machine Learning')
+        Partner.objects.create(name='Partner Org')
+        Project.objects.create(title='Crop Disease Detection', description='...')
+        News.objects.create(title='Hackathon Results')
+        Event.objects.create(title='Upcoming Meetup', event_start=now() + timedelta(days=3))
+        Event.objects.create(
+            title='Past Workshop',
+            event_start=now() - timedelta(days=3),
+            event_end=now() - timedelta(days=2),
+        )
+        for category in ('student', 'faculty'):
+            Leader.objects.create(
+                full_name=f'{category} lead',
+                position='Lead',
+                category=category,
+                start_date=now().date() - timedelta(days=10),
+            )
+
+    def test_home_stays_within_query_budget(self):
+        get_site_chrome()  # warm the site chrome; the page itself is not cached yet
+        # Version counters are served from the cache once the site is running
+        get_content_version()
+        get_model_versions([model._meta.label for model in apps.get_models()])
+        with self.assertNumQueries(self.HOME_QUERY_BUDGET):
+            response = self.client.get('/')
+        self.assertContains(response, 'Upcoming Meetup')
+        self.assertContains(response, 'student lead')
+        self.assertContains(response, 'Partner Org')
+
+    def test_home_runs_no_query_twice(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(len(statements), len(set(statements)))
+
+
+class SiteChromeTests(CacheTestCase):
+
+    def test_bundle_holds_records_not_instances(self):
+        SiteSettings.objects.create(site_name='KUAI Test', favicon='favicons/icon.png')
+        ContactInfo.objects.create(address='Kabale', email='info@example.com', phone='+256 700 000000')
+        chrome = get_site_chrome()
+        for name, value in chrome.items():
+            for item in value if isinstance(value, list) else [value]:
+                self.assertNotIsInstance(item, Model, name)
+        self.assertEqual(chrome['site_settings'].favicon.url, '/media/favicons/icon.png')
+        self.assertFalse(chrome['site_settings'].background_image)
+        self.assertEqual(chrome['contact_info'].email, 'info@example.com')
+        self.assertIsNone(chrome['about_page'])
+
+
+class PageCacheTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Research.objects.create(title='Machine Learning')
+
+    def test_anonymous_home_served_from_cache(self):
+        first = self.client.get('/')
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get('/')
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+
+    def test_publish_invalidates_cached_page(self):
+        self.client.get('/')
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='Fresh Announcement')
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Fresh Announcement')
+
+    def test_csrf_token_is_per_visitor(self):
+        self.client.get('/')
+        response = self.client.get('/')
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_indabax_home_cached(self):
+        self.client.get('/communities/indabax/')
+        response = self.client.get('/communities/indabax/')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+
+class CommitInvalidationTests(CacheTestCase):
+    """Caches are invalidated when the edit commits, not when the row is written."""
+
+    def setUp(self):
+        super().setUp()
+        SiteSettings.objects.create(site_name='KUAI Test')
+        Research.objects.create(title='Machine Learning')
+
+    def test_reads_before_commit_stay_under_the_old_version(self):
+        self.client.get('/')
+        version = get_content_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                News.objects.create(title='Fresh Announcement')
+                # Another worker still sees the old rows here; what it
+                # caches now must not outlive the commit
+                self.assertEqual(get_content_version(), version)
+                self.assertIsNotNone(cache.get(SITE_CHROME_KEY))
+                self.assertEqual(self.client.get('/')['X-Page-Cache'], 'hit')
+        self.assertGreater(get_content_version(), version)
+        self.assertIsNone(cache.get(SITE_CHROME_KEY))
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Fresh Announcement')
+
+    def test_rolled_back_edit_bumps_nothing(self):
+        version = get_content_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    News.objects.create(title='Never published')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_content_version(), version)
+        self.assertEqual(VersionCounter.objects.get(key=CONTENT_VERSION_KEY).value, version)
+
+
+class ListingTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.starts_at = now() + timedelta(minutes=30)
+        Event.objects.create(title='Meetup', event_start=self.starts_at)
+        Research.objects.create(title='Machine Learning')  # the navbar needs one
+
+    def test_events_fresh_until_next_start(self):
+        entry = event_listings()
+        self.assertEqual([event.title for event in entry.value['upcoming']], ['Meetup'])
+        self.assertEqual(entry.fresh_until, self.starts_at.timestamp())
+        with self.assertNumQueries(0):
+            event_listings()
+
+    def test_edit_shows_up_before_boundary(self):
+        event_listings()
+        with self.captureOnCommitCallbacks(execute=True):
+            Event.objects.create(title='Hackathon', event_start=now() + timedelta(days=1))
+        titles = [event.title for event in event_listings().value['upcoming']]
+        self.assertEqual(titles, ['Meetup', 'Hackathon'])
+
+    def test_leaders_change_the_day_after_term_ends(self):
+        today = now().date()
+        Leader.objects.create(full_name='Ada', position='President', start_date=today, end_date=today)
+        self.assertEqual([leader.full_name for leader in current_leaders().value], ['Ada'])
+        boundary = next_leader_change(now())
+        self.assertEqual(boundary.date(), today + timedelta(days=1))
+        self.assertEqual((boundary.hour, boundary.minute), (0, 0))
+
+    def test_home_page_cached_only_until_next_event(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        page_timeouts = [call.args[2] for call in cache_set.call_args_list if call.args[0].startswith('page:')]
+        self.assertEqual(len(page_timeouts), 1)
+        self.assertLessEqual(page_timeouts[0], 30 * 60)
+
+    def test_api_events_served_from_listing(self):
+        event_listings()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/events/?type=upcoming')
+        self.assertEqual(response.json()['events'][0]['title'], 'Meetup')
+
+
+class ApiPaginationTests(CacheTestCase):
+
+    def walk(self, url, items_key, **params):
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = self.client.get(url, {**params, 'cursor': cursor, 'per_page': 2}).json()
+            seen += [item['title'] for item in data[items_key]]
+            self.assertEqual(data['has_next'], data['next_cursor'] is not None)
+            cursor = data['next_cursor']
+        return seen
+
+    def test_project_cursor_pages(self):
+        published = now()
+        for number in range(7):
+            project = Project.objects.create(title=f'Project {number}', description='...')
+            # Two share a publish_date; id breaks the tie
+            Project.objects.filter(pk=project.pk).update(publish_date=published - timedelta(days=number // 2))
+        expected = [p.title for p in Project.objects.order_by('-publish_date', 'id')]
+        self.assertEqual(self.walk('/api/projects/', 'projects'), expected)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/projects/', {'cursor': ''})
+        # The ETag's aggregate (kuai_club.conditional), then the page
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('COUNT', queries[1]['sql'])
+        self.assertEqual(self.client.get('/api/projects/?page=3').json()['total_count'], 7)
+
+    def test_event_cursor_pages(self):
+        for number in range(5):
+            Event.objects.create(title=f'Upcoming {number}', event_start=now() + timedelta(days=number % 3 + 1))
+            Event.objects.create(
+                title=f'Past {number}',
+                event_start=now() - timedelta(days=10),
+                event_end=now() - timedelta(days=number % 2 + 1),
+            )
+        upcoming = [event.title for event in event_listings().value['upcoming']]
+        past = [event.title for event in event_listings().value['past']]
+        self.assertEqual(self.walk('/api/events/', 'events', type='upcoming'), upcoming)
+        self.assertEqual(self.walk('/api/events/', 'events', type='past'), past)
+
+    def test_bad_cursor(self):
+        for cursor in ('nonsense', 'WzEsMl0'):
+            self.assertEqual(self.client.get('/api/projects/', {'cursor': cursor}).status_code, 400)
+            self.assertEqual(self.client.get('/api/events/', {'cursor': cursor}).status_code, 400)
+
+
+def image_upload(name, size, fmt='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ConditionalApiTests(CacheTestCase):
+
+    def test_projects_not_modified(self):
+        first = Project.objects.create(title='First', description='...')
+        Project.objects.create(title='Second', description='...')
+        response = self.client.get('/api/projects/')
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/api/projects/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Deleting a row that isn't the latest still changes the tag
+        first.delete()
+        response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_events_not_modified_from_listing(self):
+        Event.objects.create(title='Upcoming', event_start=now() + timedelta(days=1))
+        Event.objects.create(title='Past', event_start=now() - timedelta(days=2), event_end=now() - timedelta(days=1))
+        upcoming = self.client.get('/api/events/?type=upcoming')
+        past = self.client.get('/api/events/?type=past')
+        self.assertNotEqual(upcoming['ETag'], past['ETag'])
+        self.assertLessEqual(int(upcoming['Cache-Control'].split('max-age=')[1]), 60)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/events/?type=past', HTTP_IF_NONE_MATCH=past['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # The countdown in upcoming events changes every minute
+        with mock.patch('kuai_club.views.time.time', return_value=time.time() + 60):
+            response = self.client.get('/api/events/?type=upcoming', HTTP_IF_NONE_MATCH=upcoming['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class SerializerTests(CacheTestCase):
+
+    def test_values_match_instances(self):
+        project = Project.objects.create(title='Project', description='x' * 5000, url=None)
+        Project.objects.filter(pk=project.pk).update(image='project_images/a photo.jpg')
+        project.refresh_from_db()
+
+        with CaptureQueriesContext(connection) as queries:
+            payload, = PROJECT_SERIALIZER.serialize_rows(PROJECT_SERIALIZER.values(Project.objects.all()))
+        self.assertNotIn('description', queries[0]['sql'])
+        self.assertEqual(payload, {
+            'id': project.id,
+            'title': 'Project',
+            'summary': '',
+            'image_url': project.image.url,
+            'publish_date': project.publish_date.isoformat(),
+            'url': '',
+        })
+        self.assertEqual(PROJECT_SERIALIZER.serialize_objects([project]), [payload])
+
+        project.image = ''
+        self.assertEqual(PROJECT_SERIALIZER.serialize_objects([project])[0]['image_url'], '')
+
+
+class ContentApiTests(CacheTestCase):
+
+    def test_pages_and_fields(self):
+        for number in range(5):
+            News.objects.create(title=f'News {number}', content='...', publish_date=now() - timedelta(days=number))
+        News.objects.create(title='Hidden', is_published=False)
+        titles, cursor = [], ''
+        while cursor is not None:
+            data = self.client.get('/api/content/news/', {'fields': 'title', 'per_page': 2, 'cursor': cursor}).json()
+            self.assertTrue(all(set(item) == {'id', 'title'} for item in data['items']))
+            titles += [item['title'] for item in data['items']]
+            cursor = data['next_cursor']
+        self.assertEqual(titles, [f'News {number}' for number in range(5)])
+
+        self.assertEqual(self.client.get('/api/content/news/', {'fields': 'secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/content/news/', {'title': 'News 1'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/content/nothing/').status_code, 404)
+        self.assertIn('indabax-sessions', self.client.get('/api/content/').json()['resources'])
+
+    def test_include_without_n_plus_one(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            speaker = IndabaxLeader.objects.create(
+                name='Speaker', position='President', photo='leaders/a.jpg', term_start=now().date(),
+            )
+            for number in range(4):
+                session = Session.objects.create(title=f'Session {number}')
+                session.speakers.add(speaker)
+                SessionImage.objects.create(session=session, image=f'session_photos/{number}.jpg')
+            Session.objects.create(title='Empty')
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/content/indabax-sessions/', {'include': 'speakers,images'}).json()
+        # The page, then one query per include
+        self.assertEqual(len(queries), 3)
+        by_title = {item['title']: item for item in data['items']}
+        self.assertEqual([leader['name'] for leader in by_title['Session 2']['speakers']], ['Speaker'])
+        self.assertEqual(by_title['Session 2']['images'][0]['image_url'], '/media/session_photos/2.jpg')
+        self.assertEqual(by_title['Empty']['images'], [])
+
+        session = Session.objects.get(title='Session 1')
+        data = self.client.get('/api/content/indabax-session-images/', {'session': session.pk}).json()
+        self.assertEqual([item['session'] for item in data['items']], [session.pk])
+
+    def test_filters_must_be_indexed(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ContentResource('news', News, fields={'id': Column()}, ordering=['id'], filters=['summary'])
+
+
+class HomePayloadTests(CacheTestCase):
+
+    def test_document_and_sections_since(self):
+        News.objects.create(title='Headline', summary='...')
+        Event.objects.create(title='Upcoming', event_start=now() + timedelta(days=1))
+        Project.objects.create(title='Project', description='...')
+        document = json.loads(self.client.get('/api/home/').content)
+        self.assertEqual(set(document['sections']), set(document['versions']))
+        self.assertEqual(
+            set(document['sections']),
+            {'hero', 'upcoming_events', 'past_events', 'projects', 'news', 'partners', 'gallery'},
+        )
+        self.assertEqual([item['title'] for item in document['sections']['news']['items']], ['Headline'])
+
+        # Served precompressed from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/home/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), document)
+        self.assertEqual(
+            self.client.get('/api/home/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='Second headline', summary='...')
+        since = ','.join(f'{name}:{version}' for name, version in document['versions'].items())
+        partial = json.loads(self.client.get('/api/home/', {'since': since}).content)
+        self.assertEqual(list(partial['sections']), ['news'])
+        self.assertNotEqual(partial['versions']['news'], document['versions']['news'])
+        self.assertEqual(partial['versions']['hero'], document['versions']['hero'])
+
+        partial = json.loads(self.client.get('/api/home/', {'sections': 'projects'}).content)
+        self.assertEqual(list(partial['versions']), ['projects'])
+        self.assertEqual(self.client.get('/api/home/', {'sections': 'footer'}).status_code, 400)
+
+
+class ImageJobTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def process_queue(self):
+        call_command('process_images', '--once', stdout=StringIO())
+
+    def test_every_image_field_has_a_spec(self):
+        unprocessed = {f'{model._meta.label}.{field_name}' for model, field_name in skipped_image_fields()}
+        # Multi-size .ico favicons are served as uploaded
+        self.assertEqual(unprocessed, {'kuai_club.SiteSettings.favicon'})
+
+    def test_save_only_queues_the_resize(self):
+        with mock.patch('kuai_club.images.Image.open') as image_open:
+            image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        image_open.assert_not_called()
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.source), (ImageJob.PENDING, image.image.name))
+
+    def test_worker_points_field_at_resized_copy(self):
+        image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        original = image.image.name
+        self.process_queue()
+
+        image.refresh_from_db()
+        self.assertNotEqual(image.image.name, original)
+        self.assertEqual((image.image.width, image.image.height), (1280, 960))
+        self.assertTrue(image.image.storage.exists(original))  # the upload is kept
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+        self.assertEqual(MediaAsset.objects.get(source=original).derivative, image.image.name)
+
+        image.save()  # re-saving with the copy queues nothing
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+    def test_variants_and_srcset(self):
+        image = GalleryImage.objects.create(image=image_upload('wide.png', (1500, 500)))
+        self.process_queue()
+        image.refresh_from_db()
+
+        asset = MediaAsset.objects.get()
+        self.assertEqual([width for width, _ in asset.variants], [320, 640, 1024, 1500])
+        html = Template('{% load kuai_media %}<img {% img_srcset image "50vw" %}>').render(Context({'image': image.image}))
+        self.assertIn(f'src="{image.image.url}"', html)
+        self.assertIn(f'{image.image.storage.url(asset.variants[0][1])} 320w, ', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('width="1280" height="427"', html)
+
+    def test_metadata_recorded_once_processed(self):
+        image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        self.process_queue()
+        image.refresh_from_db()
+        asset = MediaAsset.objects.get()
+        self.assertEqual(
+            (asset.width, asset.height, asset.format, asset.dominant_color),
+            (1280, 960, 'PNG', '#008080'),
+        )
+        self.assertEqual(asset.bytes, image.image.size)
+        html = Template('{% load kuai_media %}{% responsive_background image ".bg" %}').render(Context({'image': image.image}))
+        self.assertIn('background-color: #008080;', html)
+
+    def test_placeholder_inlined(self):
+        image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        self.process_queue()
+        image.refresh_from_db()
+        lqip = MediaAsset.objects.get().placeholder
+        self.assertTrue(lqip.startswith('data:image/jpeg;base64,'))
+        self.assertLess(len(lqip), 1500)
+        html = Template(
+            '{% load kuai_media %}<img {% img_srcset image placeholder=True %}>{% responsive_background image ".bg" %}'
+        ).render(Context({'image': image.image}))
+        self.assertIn(f'style="background: center / cover no-repeat url(&quot;{lqip}&quot;)"', html)
+        self.assertIn(f', url("{lqip}");', html)
+
+    def test_upload_shared_by_fields_with_different_specs(self):
+        gallery = GalleryImage.objects.create(image=image_upload('shared.png', (1000, 500)))
+        project = Project.objects.create(title='Shared', description='...', image=image_upload('shared.png', (1000, 500)))
+        self.assertEqual(gallery.image.name, project.image.name)  # one blob
+        self.process_queue()
+        gallery.refresh_from_db()
+        project.refresh_from_db()
+
+        # Shown as is by the gallery, replaced by an 800px copy for the project
+        self.assertEqual(MediaAsset.objects.count(), 2)
+        render = Template('{% load kuai_media %}<img {% img_srcset image %}>').render
+        self.assertIn('width="1000" height="500"', render(Context({'image': gallery.image})))
+        self.assertIn('width="800" height="400"', render(Context({'image': project.image})))
+        # The upload's URL is looked up with both specs
+        source_url = gallery.image.url
+        gallery_spec, project_spec = GalleryImage.IMAGE_SPECS['image'], Project.IMAGE_SPECS['image']
+        media_info = get_media_info()
+        self.assertEqual(media_info.get(source_url, gallery_spec).width, 1000)
+        self.assertIsNone(media_info.get(source_url, project_spec).width)
+        self.assertEqual(media_info.get(source_url).width, 1000)
+
+    def test_srcset_falls_back_to_src_before_processing(self):
+        image = GalleryImage.objects.create(image=image_upload('new.png', (800, 600)))
+        html = Template('{% load kuai_media %}<img {% img_srcset image %}>').render(Context({'image': image.image}))
+        self.assertEqual(html, f'<img src="{image.image.url}">')
+
+    @skipUnless(features.check('avif') and features.check('webp'), 'Pillow built without AVIF/WebP')
+    def test_media_view_negotiates_alternate_encodings(self):
+        image = GalleryImage.objects.create(image=image_upload('photo.jpg', (2000, 1500), 'JPEG'))
+        self.process_queue()
+        image.refresh_from_db()
+        self.assertEqual(MediaAsset.objects.get().encodings, ['avif', 'webp'])
+        path = image.image.name
+        factory = RequestFactory()
+
+        cases = [
+            ('image/avif,image/webp,image/apng,*/*;q=0.8', 'image/avif'),
+            ('image/webp,*/*', 'image/webp'),
+            ('image/avif;q=0,image/webp', 'image/webp'),
+            ('*/*', 'image/jpeg'),
+        ]
+        for accept, content_type in cases:
+            with self.subTest(accept=accept):
+                response = serve_media(factory.get('/media/' + path, HTTP_ACCEPT=accept), path)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertIn('Accept', response['Vary'])
+                # The encodings are rewritten in place on reprocessing
+                self.assertEqual('immutable' in response.get('Cache-Control', ''), content_type == 'image/jpeg')
+
+    def test_unchanged_image_never_processed_twice(self):
+        image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        self.process_queue()
+        copy = GalleryImage.objects.create(image=image_upload('copy.png', (2000, 1500)))
+        with mock.patch('kuai_club.image_jobs.Image.open') as image_open:
+            self.process_queue()
+        image_open.assert_not_called()
+        image.refresh_from_db()
+        copy.refresh_from_db()
+        self.assertEqual(copy.image.name, image.image.name)
+        self.assertEqual(MediaAsset.objects.count(), 1)
+
+    def test_same_upload_processed_per_spec(self):
+        gallery = GalleryImage.objects.create(image=image_upload('logo.png', (300, 200)))
+        partner = Partner.objects.create(name='Partner', image=image_upload('logo.png', (300, 200)))
+        self.assertEqual(gallery.image.name, partner.image.name)
+        self.process_queue()
+        gallery.refresh_from_db()
+        partner.refresh_from_db()
+        self.assertEqual((gallery.image.width, gallery.image.height), (300, 200))  # shown as is
+        self.assertEqual((partner.image.width, partner.image.height), (150, 150))
+        self.assertEqual(MediaAsset.objects.count(), 2)
+
+    def test_reprocess_after_policy_change(self):
+        image = GalleryImage.objects.create(image=image_upload('wide.png', (1500, 500)))
+        self.process_queue()
+        checkpoint = f'{self.media_root}/checkpoint'
+        out = StringIO()
+        call_command('reprocess_images', '--dry-run', '--checkpoint', checkpoint, stdout=out)
+        self.assertIn('0 images to process', out.getvalue())
+        self.assertIn('skipped: kuai_club.SiteSettings.favicon has no IMAGE_SPECS entry (0 uploads)', out.getvalue())
+        self.assertIn('1 image fields without a spec skipped', out.getvalue())
+
+        with override_settings(IMAGE_VARIANT_WIDTHS=(320, 800)):
+            out = StringIO()
+            call_command('reprocess_images', '--workers', '1', '--checkpoint', checkpoint, stdout=out)
+            self.assertIn('Processed 1 images', out.getvalue())
+            self.assertIn('images/s', out.getvalue())
+            image.refresh_from_db()
+            asset = MediaAsset.objects.latest('pk')
+            self.assertEqual(asset.derivative, image.image.name)
+            self.assertEqual([width for width, _ in asset.variants], [320, 800])
+            out = StringIO()
+            call_command('reprocess_images', '--dry-run', '--checkpoint', checkpoint, stdout=out)
+            self.assertIn('0 images to process', out.getvalue())
+
+    def test_exif_orientation_applied_and_metadata_stripped(self):
+        buffer = BytesIO()
+        img = Image.new('RGB', (600, 300), 'teal')
+        exif = img.getexif()
+        exif[ExifTags.Base.Orientation] = 6  # stored sideways
+        exif[ExifTags.Base.Make] = 'Phone'
+        img.save(buffer, 'JPEG', exif=exif)
+        image = GalleryImage.objects.create(image=SimpleUploadedFile('phone.jpg', buffer.getvalue()))
+        self.process_queue()
+        image.refresh_from_db()
+        # Small enough to show as is, but not sideways or with its EXIF
+        with Image.open(image.image.open('rb')) as shown:
+            self.assertEqual(shown.size, (300, 600))
+            self.assertFalse(shown.getexif())
+
+    @override_settings(IMAGE_MAX_PIXELS=1_000_000)
+    def test_pixel_budget(self):
+        photo = GalleryImage.objects.create(image=image_upload('photo.jpg', (2000, 1500), 'JPEG'))
+        GalleryImage.objects.create(image=image_upload('scan.png', (2000, 1500)))
+        with self.assertLogs('kuai_club.image_jobs', 'ERROR'):
+            self.process_queue()
+        # The JPEG is decoded at half its size; the PNG can't be
+        photo.refresh_from_db()
+        self.assertEqual((photo.image.width, photo.image.height), (1000, 750))
+        failed = ImageJob.objects.get(source__endswith='.png')
+        self.assertIn('ImageTooLarge', failed.last_error)
+
+    def test_small_upload_shown_as_is(self):
+        image = GalleryImage.objects.create(image=image_upload('small.png', (300, 200)))
+        self.process_queue()
+        original = image.image.name
+        image.refresh_from_db()
+        self.assertEqual(image.image.name, original)
+        self.assertEqual(MediaAsset.objects.get().derivative, '')
+
+    @override_settings(IMAGE_JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_retried_then_given_up(self):
+        GalleryImage.objects.create(image=SimpleUploadedFile('broken.png', b'not an image'))
+        with self.assertLogs('kuai_club.image_jobs', 'ERROR'):
+            self.process_queue()
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.PENDING, 1))
+        self.assertGreater(job.run_after, now())
+        self.assertIn('UnidentifiedImageError', job.last_error)
+
+        ImageJob.objects.update(run_after=now())
+        with self.assertLogs('kuai_club.image_jobs', 'ERROR'):
+            self.process_queue()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ImageJob.FAILED, 2))
+
+
+class ContentAddressedStorageTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_same_content_stored_once(self):
+        gallery = GalleryImage.objects.create(image=image_upload('photo.png', (40, 30)))
+        partner = Partner.objects.create(name='Partner', image=image_upload('logo.png', (40, 30)))
+        self.assertEqual(gallery.image.name, partner.image.name)
+        self.assertTrue(gallery.image.name.startswith('blobs/'))
+        other = GalleryImage.objects.create(image=image_upload('photo.png', (50, 30)))
+        self.assertNotEqual(other.image.name, gallery.image.name)
+
+    def test_blobs_served_as_immutable(self):
+        image = GalleryImage.objects.create(image=image_upload('photo.png', (40, 30)))
+        path = image.image.name
+        response = serve_media(RequestFactory().get('/media/' + path), path)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_dedupe_media_collapses_old_uploads(self):
+        legacy = FileSystemStorage(location=self.media_root)
+        content = image_upload('photo.png', (40, 30)).read()
+        for name in ('gallery/photo.png', 'gallery/photo_AbC123.png'):
+            legacy.save(name, ContentFile(content))
+        first = GalleryImage.objects.create(image='gallery/photo.png')
+        second = GalleryImage.objects.create(image='gallery/photo_AbC123.png')
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('2 files to move into 1 blobs, 1 duplicates', out.getvalue())
+        self.assertTrue(legacy.exists('gallery/photo.png'))  # a dry run by default
+
+        call_command('dedupe_media', '--apply', stdout=StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(legacy.exists(first.image.name))
+        self.assertFalse(legacy.exists('gallery/photo.png'))
+        self.assertFalse(legacy.exists('gallery/photo_AbC123.png'))
+        self.assertEqual(set(ImageJob.objects.values_list('source', flat=True)), {first.image.name})
+
+    def test_collect_media_removes_only_unreferenced_files(self):
+        image = GalleryImage.objects.create(image=image_upload('big.png', (2000, 1500)))
+        call_command('process_images', '--once', stdout=StringIO())
+        image.refresh_from_db()
+        storage = image.image.storage
+        replaced = storage.save('gallery/old.png', ContentFile(b'old upload'))
+        stale = MediaAsset.objects.create(source='gallery/gone.png', derivative=storage.save('x.png', ContentFile(b'x')))
+        kept = {image.image.name, *(name for _, name in MediaAsset.objects.get(derivative=image.image.name).variants)}
+
+        out = StringIO()
+        call_command('collect_media', '--min-age', '0', stdout=out)
+        self.assertIn('2 unreferenced files', out.getvalue())
+        self.assertTrue(storage.exists(replaced))
+
+        call_command('collect_media', '--min-age', '0', '--delete', stdout=StringIO())
+        self.assertFalse(storage.exists(replaced))
+        self.assertFalse(storage.exists(stale.derivative))
+        self.assertFalse(MediaAsset.objects.filter(pk=stale.pk).exists())
+        for name in kept:
+            self.assertTrue(storage.exists(name), name)
+
+        # Fresh files may belong to an upload being saved
+        storage.save('gallery/new.png', ContentFile(b'new upload'))
+        out = StringIO()
+        call_command('collect_media', stdout=out)
+        self.assertIn('0 unreferenced files', out.getvalue())
+
+
+class FragmentCacheTests(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        reset_fragment_cache_stats()
+        self.research = Research.objects.create(title='Machine Learning')
+        self.url = f'/research/{self.research.id}/'
+
+    def test_layout_fragments_hit_after_first_render(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats = fragment_cache_stats()
+        self.assertEqual(stats['navbar'], {'hits': 1, 'misses': 1})
+        self.assertEqual(stats['footer'], {'hits': 1, 'misses': 1})
+
+    def test_edit_to_shown_model_rerenders_fragment(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            ContactInfo.objects.create(address='Kikungiri Hill', email='kuai@example.com', phone='0700')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Kikungiri Hill')
+        self.assertEqual(fragment_cache_stats()['footer'], {'hits': 0, 'misses': 2})
+        # The navbar does not show ContactInfo and stays cached
+        self.assertEqual(fragment_cache_stats()['navbar'], {'hits': 1, 'misses': 1})
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-tier-tests'},
+}, CACHE_LOCK_DIR=TEST_LOCK_DIR)
+class TwoTierCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def make_cache(self, **options):
+        return TwoTierCache('shared', {'OPTIONS': options})
+
+    def test_workers_share_the_second_tier(self):
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.set('greeting', 'hello')
+        self.assertEqual(worker_b.get('greeting'), 'hello')
+        worker_b.delete('greeting')
+        worker_a.clear_local()
+        self.assertIsNone(worker_a.get('greeting'))
+
+    def test_first_tier_is_bounded_lru(self):
+        local = self.make_cache(L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            local.set(key, key)
+        caches['shared'].clear()
+        self.assertIsNone(local.get('a'))  # evicted from tier 1, gone from tier 2
+        self.assertEqual(local.get('c'), 'c')
+
+    def test_first_tier_entries_expire(self):
+        local = self.make_cache(L1_TIMEOUT=0.05)
+        local.set('key', 'value')
+        caches['shared'].set('key', 'changed by another worker')
+        self.assertEqual(local.get('key'), 'value')
+        time.sleep(0.06)
+        self.assertEqual(local.get('key'), 'changed by another worker')
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        shared = caches['shared']
+        get_or_compute('report', lambda: 'v1', timeout=0.01, cache=shared)
+        time.sleep(0.02)
+        acquire_lock('report:lock', 30)  # another worker is recomputing
+        compute = mock.Mock(return_value='v2')
+        self.assertEqual(get_or_compute('report', compute, timeout=0.01, cache=shared), 'v1')
+        compute.assert_not_called()
+        release_lock('report:lock')
+        self.assertEqual(get_or_compute('report', compute, timeout=0.01, cache=shared), 'v2')
+
+    def test_stale_value_refreshed_in_background(self):
+        shared = caches['shared']
+        get_or_compute_until('listing', lambda: ('v1', time.time() + 0.01), cache=shared)
+        time.sleep(0.02)
+        entry = get_or_compute_until('listing', lambda: ('v2', None), cache=shared, background=True)
+        self.assertEqual(entry.value, 'v1')
+        for _ in range(100):
+            if shared.get('listing').value == 'v2':
+                break
+            time.sleep(0.01)
+        self.assertEqual(get_or_compute_until('listing', mock.Mock(), cache=shared).value, 'v2')
+
+    def test_lock_is_exclusive_until_released_or_stale(self):
+        self.assertTrue(acquire_lock('report:lock', 30))
+        self.addCleanup(release_lock, 'report:lock')
+        self.assertFalse(acquire_lock('report:lock', 30))
+        release_lock('report:lock')
+        self.assertTrue(acquire_lock('report:lock', 30))
+        # Left behind by a worker that died: taken over once it is too old
+        with mock.patch('kuai_club.cache_backends.time.time', return_value=time.time() + 60):
+            self.assertTrue(acquire_lock('report:lock', 30))
+
+    def test_cold_miss_waits_briefly_then_computes(self):
+        shared = caches['shared']
+        acquire_lock('report:lock', 30)  # a worker stuck on a slow rebuild
+        self.addCleanup(release_lock, 'report:lock')
+        started = time.monotonic()
+        self.assertEqual(get_or_compute('report', lambda: 'v1', cache=shared, wait_timeout=0.1), 'v1')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(shared.get('report').value, 'v1')
+
+
+class VersioningTests(CacheTestCase):
+
+    def test_bumps_are_counted_in_the_database(self):
+        before = get_content_version()
+        self.assertEqual(bump_content_version(), before + 1)
+        self.assertEqual(bump_content_version(), before + 2)
+        self.assertEqual(VersionCounter.objects.get(key=CONTENT_VERSION_KEY).value, before + 2)
+
+    def test_counter_survives_the_cache(self):
+        version, = get_model_versions(['kuai_club.News'])
+        bump_model_version(News)
+        cache.clear()
+        self.assertEqual(get_model_versions(['kuai_club.News']), (version + 1,))
+
+    def test_bump_overwrites_an_older_cached_copy(self):
+        before = get_content_version()
+        # Another worker's bump already reached the database
+        VersionCounter.objects.filter(key=CONTENT_VERSION_KEY).update(value=before + 5)
+        self.assertEqual(bump_content_version(), before + 6)
+        self.assertEqual(get_content_version(), before + 6)
+
+    def test_miss_does_not_overwrite_a_newer_bump(self):
+        before = get_content_version()
+        cache.clear()
+        load = versioning._load
+
+        def load_then_bump(keys):
+            values = load(keys)
+            # Another worker bumps and publishes between this reader's
+            # database read and its cache write
+            bump_content_version()
+            return values
+
+        with mock.patch('kuai_club.versioning._load', side_effect=load_then_bump):
+            self.assertEqual(get_content_version(), before + 1)
+        self.assertEqual(cache.get(CONTENT_VERSION_KEY), before + 1)
+
+
+class WarmupTests(CacheTestCase):
+
+    def test_chrome_is_replaced_without_a_gap(self):
+        SiteSettings.objects.create(site_name='Old name')
+        get_site_chrome()
+        SiteSettings.objects.update(site_name='New name')  # no signal, the old bundle stays
+        with mock.patch.object(TwoTierCache, 'delete', side_effect=AssertionError('bundle deleted')):
+            rebuild_site_chrome()
+        self.assertEqual(get_site_chrome()['site_settings'].site_name, 'New name')
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=TEST_LOCK_DIR)
+class WarmCacheCommandTests(TransactionTestCase):
+    """warm_cache requests pages from worker threads, which only see committed rows."""
+
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(site_name='KUAI Test')
+        Research.objects.create(title='Machine Learning')
+
+    def test_fills_the_caches_and_reports_each_key(self):
+        out = StringIO()
+        call_command(
+            'warm_cache', '--host', 'testserver', '--workers', '2',
+            '--url', '/', '--url', '/api/projects/', '--url', '/no-such-page/',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertRegex(output, r'site_chrome +\d+\.\d ms  built')
+        self.assertRegex(output, r'/ +\d+\.\d ms  200 \(miss\)')
+        self.assertRegex(output, r'/api/projects/ +\d+\.\d ms  200')
+        self.assertRegex(output, r'/no-such-page/ +\d+\.\d ms  404')
+        self.assertIn('Done: 4 keys, 1 failed', output)
+
+        self.assertEqual(get_site_chrome()['site_settings'].site_name, 'KUAI Test')
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'hit')
+
+    def test_default_urls_all_render(self):
+        failed = [result for result in warm_caches(workers=2, host='testserver') if not result['ok']]
+        self.assertEqual(failed, [])
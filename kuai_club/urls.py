@@ -22,6 +22,12 @@ urlpatterns = [
     path('project/<int:page_id>/', views.project_page, name='project_page'),  # This is what your template expects
     path('projects/id/<int:page_id>/', views.project_page, name='project_page_by_id'),  # Alternative pattern
     path('api/projects/', views.api_projects, name='api_projects'),
+
+    # Read-only API over every public model of both apps
+    path('api/content/', views.api_content, name='api_content'),
+    path('api/content/<slug:resource>/', views.api_content, name='api_content_resource'),
+    # Every home page section in one request
+    path('api/home/', views.api_home, name='api_home'),
     
     # Research
     path('research/<int:page_id>/', views.research_page, name='research_page'),
@@ -33,4 +39,7 @@ urlpatterns = [
     path('community/<int:page_id>/', views.community_page, name='community_page'),
     
     path('join/submit/', views.join_club_submit, name='join_club_submit'),
+
+    # Cache diagnostics (staff only)
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Content version counters.
+
+A single integer that changes whenever any public content in kuai_club or
+indabax_app is saved or deleted (see kuai_club.signals). Cache keys that
+embed it, such as the full-page cache, go stale on the next publish
+without having to be found and deleted one by one. Each model also has
+its own counter for entries that depend on only a few models.
+
+The counters live in VersionCounter rows and are bumped with a single
+UPDATE ... SET value = value + 1, which the database applies atomically;
+the file-based cache has no atomic incr() across processes, so two
+workers bumping at once could both write the same value there. Reads are
+served from a copy in the cache and only go to the database on a miss;
+both paths write that copy with the check in _publish().
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import VersionCounter
+
+CONTENT_VERSION_KEY = 'content_version'
+
+
+def _initial_value():
+    # Start from the clock rather than 1 so that a new counter never comes
+    # back at a value used by entries cached before it existed
+    return int(time.time() * 1000)
+
+
+def _load(keys):
+    """``{key: value}`` from the database, creating missing counters."""
+    # Counters another worker created first keep their value
+    VersionCounter.objects.bulk_create(
+        [VersionCounter(key=key, value=_initial_value()) for key in keys], ignore_conflicts=True,
+    )
+    return dict(VersionCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+
+
+def _publish(values):
+    """
+    Copy counters read from the database (``{key: value}``) to the cache
+    and return them.
+
+    A worker that read a counter just before another one bumped it may
+    write its older value after the newer one, on a cache miss as much as
+    after its own bump. So the database is checked again after writing:
+    whoever writes last has seen the final values.
+    """
+    while True:
+        cache.set_many(values, None)
+        unchanged = Q()
+        for key, value in values.items():
+            unchanged |= Q(key=key, value=value)
+        if VersionCounter.objects.filter(unchanged).count() == len(values):
+            return values
+        values = dict(VersionCounter.objects.filter(key__in=values).values_list('key', 'value'))
+
+
+def _get(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        versions.update(_publish(_load(missing)))
+    return tuple(versions[key] for key in keys)
+
+
+def _bump(key):
+    if not VersionCounter.objects.filter(key=key).update(value=F('value') + 1):
+        _load([key])
+        VersionCounter.objects.filter(key=key).update(value=F('value') + 1)
+    return _publish({key: VersionCounter.objects.get(key=key).value})[key]
+
+
+def get_content_version():
+    return _get([CONTENT_VERSION_KEY])[0]
+
+
+def bump_content_version():
+    return _bump(CONTENT_VERSION_KEY)
+
+
+# --- Per-model versions ---
+#
+# One counter per model ("kuai_club.news"), for cache entries that only
+# depend on a few models, such as the layout fragments.
+
+def model_version_key(label):
+    return f'{CONTENT_VERSION_KEY}:{label.lower()}'
+
+
+def get_model_versions(labels):
+    """Return the current version of each model label, in order."""
+    return _get([model_version_key(label) for label in labels])
+
+
+def bump_model_version(model):
+    return _bump(model_version_key(model._meta.label))
@@ -1,15 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils.timezone import now
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_GET
 from django.contrib import messages
 from django.views.generic import TemplateView
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.db import models
 from django.conf import settings
 from django.core.cache import cache
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+import gzip
+import os
+import time
 from .models import (
     SiteSettings,
     Aboutus,
@@ -27,83 +34,87 @@ from .models import (
     ContactInfo
 
 )
+from .conditional import Validator, conditional_api, make_etag
+from .content_api import RESOURCES, ContentQueryError
+from .fragment_cache import fragment_cache_stats
+from .home_payload import Section, get_document, get_partial
+from .listings import current_leaders, event_listings
+from .media import negotiate_media
+from .page_cache import cache_anonymous_page
+from .serializers import Column, DateTime, Media, Text, ValuesSerializer
+from .pagination import InvalidCursor, keyset_page, sequence_page
+from .site_data import get_site_data
+from .storage import blob_digest
+from .versioning import get_model_versions
 import logging
 
 logger = logging.getLogger(__name__)
 
+@cache_anonymous_page
 def home(request):
-    site_settings = SiteSettings.objects.first()
-
-    # One main About Us entry
-    about_page = Aboutus.objects.first()
-
-    # All entries for menus/navigation
-    about_pages = Aboutus.objects.all()
-
-    leader = Leader.objects.all().order_by('position')
-    news = News.objects.all().order_by('title')
-    events = Event.objects.all().order_by('title')
-    research = Research.objects.all().order_by('title')
-    resources = Resource.objects.all().order_by('title')
-    community = CommunityOutreach.objects.all().order_by('title')
-    projects = Project.objects.all().order_by('title')
-    hero_slides = HeroSlide.objects.filter(is_active=True).order_by('order')
-
-    upcoming_events = Event.objects.filter(is_published=True, event_start__gte=now()).order_by('event_start')[:6]
-    past_events = Event.objects.filter(is_published=True, event_end__lt=now()).order_by('-event_start')[:6]
-
-    today = now().date()
-    current_leaders = Leader.objects.filter(start_date__lte=today, end_date__gte=today)
-
-    gallery_images = GalleryImage.objects.order_by('-upload_date', '-id')[:20] 
-    partners = Partner.objects.filter(is_active=True).order_by('name')
-
-    # contact and join request information
-    contact_info = ContactInfo.objects.first()
-    join_requests = ClubJoinRequest.objects.all().order_by('-date_joined')  # or 'date_joined' depending on your field name
-    
+    # Every lookup goes through the request's SiteData, which the context
+    # processors share, so each query runs at most once per render. The
+    # navbar lists (events, research, resources, community) come from the
+    # cached site chrome.
+    data = get_site_data(request)
+    site_settings = data.site_settings
+    upcoming_events = data.upcoming_events
 
     categories = [
-        ('student', 'Student Leaders', current_leaders.filter(category='student')),
-        ('faculty', 'Faculty Mentors', current_leaders.filter(category='faculty')),
-]
+        ('student', 'Student Leaders', data.current_leaders_in('student')),
+        ('faculty', 'Faculty Mentors', data.current_leaders_in('faculty')),
+    ]
 
-     
-    
-
-  
-    
     if upcoming_events and upcoming_events[0].background_image:
         background_image_url = upcoming_events[0].background_image.url
+    elif site_settings and site_settings.background_image:
+        # Fallback to SiteSettings
+        background_image_url = site_settings.background_image.url
     else:
-        # Fallback to SiteSettings or a default static image
-        site_settings = SiteSettings.objects.first()
-        if site_settings and site_settings.background_image:
-            background_image_url = site_settings.background_image.url
-        else:
-            background_image_url = '/static/images/default-background.jpg'
+        background_image_url = '/static/images/default-background.jpg'
 
     return render(request, 'kuai_club/home.html', {
         'site_settings': site_settings,
-        'about_page': about_page,
-        'about_pages': about_pages,
-        'leader': leader,
-        'news': news,
-        'events': events,
-        'research': research,
-        'resources': resources,
-        'community': community,
-        'projects': projects,
-        'hero_slides': hero_slides,
+        'about_page': data.about_page,
+        'about_pages': data.about_pages,
+        'news': data.news,
+        'projects': data.projects,
+        'hero_slides': data.hero_slides,
         'upcoming_events': upcoming_events,
-        'past_events': past_events,
+        'past_events': data.past_events,
         'background_image_url': background_image_url,
 
         'categories': categories,
-        'gallery_images': gallery_images, 
-        'partners': partners,
-        'contact_info': contact_info,
-        'join_requests': join_requests,
+        # Only queried when the gallery fragment is not cached
+        'gallery_images': SimpleLazyObject(lambda: data.gallery_images),
+        'partners': data.partners,
+        'contact_info': data.contact_info,
+    })
+
+def serve_media(request, path):
+    """
+    Serve an uploaded file, switching to its AVIF/WebP encoding when the
+    browser accepts one. The response varies on Accept, so shared caches
+    keep the encodings apart. Content-addressed blobs never change and may
+    be cached for good; their encodings may.
+    """
+    chosen, content_type = negotiate_media(path, request.headers.get('Accept', ''))
+    response = serve(request, chosen, document_root=settings.MEDIA_ROOT)
+    if content_type and response.status_code == 200:
+        response['Content-Type'] = content_type
+    # Only the blob itself is named after its content: its WebP/AVIF
+    # siblings are rewritten in place when images are reprocessed
+    if chosen == path and blob_digest(path) and response.status_code == 200:
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+@staff_member_required
+def cache_stats(request):
+    """Fragment cache hit/miss counts for this worker process."""
+    return JsonResponse({
+        "pid": os.getpid(),
+        "fragments": fragment_cache_stats(),
     })
 
 def about_pages_processor(request):
@@ -195,23 +206,15 @@ def current_leaders_by_category(request, category):
     if category not in valid_categories:
         return render(request, '404.html', status=404)
     
-    today = timezone.now().date()
-    
-    # Get current leaders (those whose term hasn't ended yet)
-    current_leaders = Leader.objects.filter(
-        category=category,
-        start_date__lte=today,  # Started on or before today
-    ).filter(
-        models.Q(end_date__isnull=True) |  # No end date (ongoing)
-        models.Q(end_date__gte=today)      # Or end date is today or future
-    ).order_by('-year_served', 'position', 'full_name')
+    # Cached until the next term starts or ends (kuai_club.listings)
+    leaders = [leader for leader in current_leaders().value if leader.category == category]
     
-    logger.info(f"Found {current_leaders.count()} current leaders for category: {category}")
+    logger.info(f"Found {len(leaders)} current leaders for category: {category}")
     
     context = {
-        'leaders': current_leaders,
+        'leaders': leaders,
         'category': category.title(),
-        'total_current_leaders': current_leaders.count(),
+        'total_current_leaders': len(leaders),
     }
     
     return render(request, 'kuai_club/current_leaders_by_category.html', context)
@@ -334,14 +337,66 @@ def hero_processor(request):
     hero_slides = HeroSlide.objects.all().order_by('title')
     return {'hero_slides': hero_slides}
 
+def _per_page(request, default):
+    per_page = request.GET.get('per_page')
+    if per_page and per_page.isdigit():
+        return max(1, min(int(per_page), 10))
+    return default
+
+
+PROJECT_SERIALIZER = ValuesSerializer(
+    Project,
+    id=Column(),
+    title=Column(),
+    summary=Column(),
+    image_url=Media('image'),
+    publish_date=DateTime(),
+    url=Text(),
+)
+
+
+def _projects_validator(request):
+    stats = Project.objects.filter(is_published=True).aggregate(
+        last_modified=models.Max('updated_at'), count=models.Count('id'),
+    )
+    return Validator(
+        make_etag(get_model_versions(['kuai_club.Project']), stats['last_modified'], stats['count']),
+        stats['last_modified'],
+        settings.API_CACHE_MAX_AGE,
+    )
+
+
+@conditional_api(_projects_validator)
 def api_projects(request):
+    """
+    Published projects, newest first. Pass ``cursor`` (empty for the first
+    page, then the ``next_cursor`` of the last response) to page by
+    (publish_date, id) without counting; ``page`` numbers still work.
+    """
     logger.info(f"API called with method: {request.method}")
     logger.info(f"GET parameters: {request.GET}")
-    
+
+    projects_qs = PROJECT_SERIALIZER.values(
+        Project.objects.filter(is_published=True).order_by('-publish_date', 'id')
+    )
+
+    if 'cursor' in request.GET:
+        try:
+            projects, next_cursor = keyset_page(
+                projects_qs, ['-publish_date', 'id'], (datetime, int),
+                request.GET['cursor'], _per_page(request, 3),
+            )
+        except InvalidCursor as e:
+            return JsonResponse({"projects": [], "has_next": False, "error": str(e)}, status=400)
+        return JsonResponse({
+            "projects": PROJECT_SERIALIZER.serialize_rows(projects),
+            "has_next": next_cursor is not None,
+            "next_cursor": next_cursor,
+        })
+
     page = int(request.GET.get('page', 1))
     logger.info(f"Requested page: {page}")
     
-    projects_qs = Project.objects.filter(is_published=True).order_by('-publish_date', 'id')
     total_count = projects_qs.count()
     logger.info(f"Total published projects: {total_count}")
     
@@ -361,18 +416,9 @@ def api_projects(request):
             "total_pages": 0
         })
 
-    projects_list = []
-    for project in projects_page:
-        project_data = {
-            "id": project.id,
-            "title": project.title,
-            "summary": project.summary,
-            "image_url": project.image.url if project.image else "",
-            "publish_date": project.publish_date.isoformat() if project.publish_date else "",
-            "url": project.url or "",
-        }
-        projects_list.append(project_data)
-        logger.info(f"Added project ID {project.id}: {project.title}")
+    projects_list = PROJECT_SERIALIZER.serialize_rows(projects_page)
+    for project in projects_list:
+        logger.info(f"Added project ID {project['id']}: {project['title']}")
 
     response_data = {
         "projects": projects_list,
@@ -385,37 +431,121 @@ def api_projects(request):
     logger.info(f"Returning response: {len(projects_list)} projects, has_next: {projects_page.has_next()}")
     return JsonResponse(response_data)
 
+
+EVENT_SERIALIZER = ValuesSerializer(
+    Event,
+    id=Column(),
+    title=Column(),
+    summary=Column(),
+    event_url=Column(),
+    image_url=Media('image'),
+    event_start=DateTime(),
+    event_end=DateTime(),
+)
+
+
+def _time_until_start(event_start):
+    # Calculate time until start for upcoming events
+    time_until_start = None
+    if event_start:
+        time_diff = event_start - now()
+        if time_diff.total_seconds() > 0:
+            days = time_diff.days
+            hours = time_diff.seconds // 3600
+            minutes = (time_diff.seconds % 3600) // 60
+            
+            time_parts = []
+            if days > 0:
+                time_parts.append(f"{days}d")
+            if hours > 0:
+                time_parts.append(f"{hours}h")
+            if minutes > 0:
+                time_parts.append(f"{minutes}m")
+            
+            time_until_start = " ".join(time_parts) if time_parts else "Less than 1 minute"
+        else:
+            time_until_start = "Event has started!"
+    return time_until_start
+
+
+def _events_json(events, event_type):
+    # The listing holds full instances already; only the payload is built here
+    payloads = EVENT_SERIALIZER.serialize_objects(events)
+    for event, event_dict in zip(events, payloads):
+        event_dict["organizer"] = getattr(event, 'organizer', '')
+        time_until_start = _time_until_start(event.event_start) if event_type == 'upcoming' else None
+        if time_until_start:
+            event_dict["time_until_start"] = time_until_start
+    return payloads
+
+
+# Cursor keys of the cached event lists (kuai_club.listings): upcoming by
+# (event_start, id), past by (event_end, id) with the latest end first
+EVENT_CURSORS = {
+    'upcoming': (lambda event: (event.event_start, event.id), lambda key: (key[0], key[1])),
+    'past': (lambda event: (event.event_end, event.id), lambda key: (-key[0].timestamp(), key[1])),
+}
+
+
+def _events_validator(request):
+    # The same cached listing the view pages through: no query
+    event_type = 'past' if request.GET.get('type') == 'past' else 'upcoming'
+    listing = event_listings()
+    events = listing.value[event_type]
+    last_modified = max((event.updated_at for event in events), default=None)
+    parts = [get_model_versions(['kuai_club.Event']), event_type, last_modified, len(events)]
+    max_age = settings.API_CACHE_MAX_AGE
+    if listing.fresh_until is not None:
+        max_age = min(max_age, listing.fresh_until - time.time())
+    if event_type == 'upcoming':
+        # time_until_start counts down by the minute
+        minute = int(time.time() // 60)
+        parts.append(minute)
+        bucket_start = datetime.fromtimestamp(minute * 60, tz=dt_timezone.utc)
+        last_modified = max(last_modified, bucket_start) if last_modified else bucket_start
+        max_age = min(max_age, (minute + 1) * 60 - time.time())
+    return Validator(make_etag(*parts), last_modified, max_age)
+
+
 @require_GET
+@conditional_api(_events_validator)
 def api_events(request):
     """
     Events API endpoint - NOTE: This should match the URL pattern /api/events/
+
+    Pass ``cursor`` (empty for the first page, then the ``next_cursor`` of
+    the last response) to page without counting; ``page`` numbers still work.
     """
     event_type = request.GET.get('type', 'upcoming')
     page_number = int(request.GET.get('page', 1))
-    per_page = request.GET.get('per_page')
-
-    logger.info(f"Events API called - type: {event_type}, page: {page_number}, per_page: {per_page}")
 
+    # Cached until the next event starts or ends (kuai_club.listings)
+    listings = event_listings().value
     if event_type == 'past':
-        queryset = Event.objects.filter(
-            is_published=True,
-            event_end__lt=now()
-        ).order_by('-event_end')
+        events = listings['past']
         default_per_page = 1
     else:  # upcoming
-        queryset = Event.objects.filter(
-            is_published=True,
-            event_start__gte=now()
-        ).order_by('event_start')
+        events = listings['upcoming']
         default_per_page = 2
 
-    if per_page and per_page.isdigit():
-        per_page = int(per_page)
-        per_page = max(1, min(per_page, 10))
-    else:
-        per_page = default_per_page
+    per_page = _per_page(request, default_per_page)
 
-    paginator = Paginator(queryset, per_page)
+    logger.info(f"Events API called - type: {event_type}, page: {page_number}, per_page: {per_page}")
+
+    if 'cursor' in request.GET:
+        key, order = EVENT_CURSORS['past' if event_type == 'past' else 'upcoming']
+        try:
+            page, next_cursor = sequence_page(events, key, order, (datetime, int), request.GET['cursor'], per_page)
+        except InvalidCursor as e:
+            return JsonResponse({"events": [], "has_next": False, "error": str(e)}, status=400)
+        return JsonResponse({
+            "events": _events_json(page, event_type),
+            "has_next": next_cursor is not None,
+            "next_cursor": next_cursor,
+            "per_page": per_page,
+        })
+
+    paginator = Paginator(events, per_page)
     
     try:
         page = paginator.page(page_number)
@@ -431,44 +561,7 @@ def api_events(request):
             "error": str(e)
         })
 
-    event_data = []
-    for event in page:
-        # Calculate time until start for upcoming events
-        time_until_start = None
-        if event_type == 'upcoming' and event.event_start:
-            time_diff = event.event_start - now()
-            if time_diff.total_seconds() > 0:
-                days = time_diff.days
-                hours = time_diff.seconds // 3600
-                minutes = (time_diff.seconds % 3600) // 60
-                
-                time_parts = []
-                if days > 0:
-                    time_parts.append(f"{days}d")
-                if hours > 0:
-                    time_parts.append(f"{hours}h")
-                if minutes > 0:
-                    time_parts.append(f"{minutes}m")
-                
-                time_until_start = " ".join(time_parts) if time_parts else "Less than 1 minute"
-            else:
-                time_until_start = "Event has started!"
-
-        event_dict = {
-            "id": event.id,
-            "title": event.title,
-            "summary": event.summary,
-            "event_url": event.event_url,
-            "image_url": event.image.url if event.image else "",
-            "organizer": getattr(event, 'organizer', ''),
-            "event_start": event.event_start.isoformat() if event.event_start else "",
-            "event_end": event.event_end.isoformat() if event.event_end else "",
-        }
-        
-        if time_until_start:
-            event_dict["time_until_start"] = time_until_start
-        
-        event_data.append(event_dict)
+    event_data = _events_json(page.object_list, event_type)
 
     logger.info(f"Returning {len(event_data)} events for page {page_number}")
     
@@ -479,9 +572,128 @@ def api_events(request):
         "page": page.number,
         "total_pages": paginator.num_pages,
         "per_page": per_page,
-        "total_count": queryset.count()
+        "total_count": len(events)
     })
 
+def _home_events(event_type):
+    # First page of api_events in cursor mode, without the countdown
+    events = event_listings().value[event_type]
+    key, order = EVENT_CURSORS[event_type]
+    page, next_cursor = sequence_page(events, key, order, (datetime, int), '', 6)
+    return {
+        "items": EVENT_SERIALIZER.serialize_objects(page),
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+
+
+# Sections of /api/home/. Each is the first page of the API that pages
+# through the rest, so its next_cursor continues there.
+HOME_SECTIONS = {
+    'hero': Section([HeroSlide], lambda: RESOURCES['hero-slides'].page({'per_page': '5'})),
+    'upcoming_events': Section(
+        [Event], lambda: _home_events('upcoming'), lambda: event_listings().fresh_until,
+    ),
+    'past_events': Section([Event], lambda: _home_events('past'), lambda: event_listings().fresh_until),
+    'projects': Section([Project], lambda: RESOURCES['projects'].page({
+        'fields': 'title,slug,summary,image_url,publish_date,url', 'per_page': '6',
+    })),
+    'news': Section([News], lambda: RESOURCES['news'].page({
+        'fields': 'title,slug,summary,url,image_url,background_image_url,publish_date', 'per_page': '10',
+    })),
+    'partners': Section([Partner], lambda: RESOURCES['partners'].page({'per_page': '100'})),
+    'gallery': Section([GalleryImage], lambda: RESOURCES['gallery'].page({'per_page': '10'})),
+}
+
+
+class InvalidHomeQuery(ValueError):
+    pass
+
+
+def _home_document(request):
+    """The HomeDocument for ``sections`` and ``since``, once per request."""
+    if not hasattr(request, 'home_document'):
+        names = [name for name in request.GET.get('sections', '').split(',') if name]
+        since = {}
+        for pair in request.GET.get('since', '').split(','):
+            if pair:
+                name, _, version = pair.partition(':')
+                since[name] = version
+        unknown = [name for name in [*names, *since] if name not in HOME_SECTIONS]
+        if unknown:
+            request.home_document = InvalidHomeQuery(f"Unknown sections: {', '.join(unknown)}")
+        elif names or since:
+            request.home_document = get_partial(HOME_SECTIONS, names or list(HOME_SECTIONS), since)
+        else:
+            request.home_document = get_document(HOME_SECTIONS)
+    return request.home_document
+
+
+def _accepts_gzip(request):
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+
+def _home_validator(request):
+    document = _home_document(request)
+    if isinstance(document, InvalidHomeQuery):
+        return Validator(make_etag('invalid'), None, 0)
+    max_age = settings.API_CACHE_MAX_AGE
+    if document.fresh_until is not None:
+        max_age = min(max_age, document.fresh_until - time.time())
+    # Distinct tags for the gzip and identity bodies
+    return Validator(make_etag(document.etag, _accepts_gzip(request)), None, max_age)
+
+
+@require_GET
+@conditional_api(_home_validator)
+def api_home(request):
+    """
+    Every home page section in one JSON document (kuai_club.home_payload):
+    ``{"versions": {section: version}, "sections": {section: payload}}``.
+    ``sections=hero,news`` limits it to some sections; ``since=hero:<version>,...``
+    leaves out those still at the version the client has.
+    """
+    document = _home_document(request)
+    if isinstance(document, InvalidHomeQuery):
+        return JsonResponse({"error": str(document)}, status=400)
+    body = document.body
+    if _accepts_gzip(request):
+        body = document.gzipped or gzip.compress(body, compresslevel=6, mtime=0)
+    response = HttpResponse(body, content_type='application/json')
+    if _accepts_gzip(request):
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _content_validator(request, resource=None):
+    # Every row shown comes from these models: their versions are enough
+    labels = [model._meta.label for model in RESOURCES[resource].models()] if resource in RESOURCES else []
+    return Validator(make_etag(resource, get_model_versions(labels)), None, settings.API_CACHE_MAX_AGE)
+
+
+@require_GET
+@conditional_api(_content_validator)
+def api_content(request, resource=None):
+    """
+    Read-only API over the public models of both apps (kuai_club.content_api).
+    Without a resource, describes them all.
+    """
+    if resource is None:
+        return JsonResponse({
+            "resources": {
+                name: {"url": reverse('kuai_club:api_content_resource', args=[name]), **content.describe()}
+                for name, content in RESOURCES.items()
+            }
+        })
+    content = RESOURCES.get(resource)
+    if content is None:
+        return JsonResponse({"error": f"Unknown resource: {resource}"}, status=404)
+    try:
+        return JsonResponse(content.page(request.GET.dict()))
+    except (ContentQueryError, InvalidCursor) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
 # Keep the old function name for backward compatibility
 def event_api_view(request):
     return api_events(request)
@@ -0,0 +1,107 @@
+"""
+Cache warm-up after a deploy or restart.
+
+Rebuilds the site chrome bundle and requests the busiest public URLs once
+(both home pages, the first pages of the JSON APIs and the leader pages
+that render), so the page, fragment and data caches are filled before
+real visitors arrive. Used by the ``warm_cache`` management command and, when the
+KUAI_PREWARM_CACHE environment variable is set, by wsgi.py at startup.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import RequestFactory
+
+from .chrome import rebuild_site_chrome
+
+logger = logging.getLogger(__name__)
+
+# Only URLs that render today, so a failure in the report is a regression.
+# /leaders/current/<category>/ is left out until its template
+# (kuai_club/current_leaders_by_category.html) exists.
+WARM_URLS = [
+    '/',
+    '/communities/indabax/',
+    '/api/projects/',
+    '/api/home/',
+    '/api/events/?type=upcoming',
+    '/api/events/?type=past',
+    '/leaders/previous/student/',
+    '/leaders/previous/faculty/',
+    '/communities/indabax/leaders/',
+    '/communities/indabax/leaders/all/',
+]
+
+
+def default_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def _warm_chrome():
+    rebuild_site_chrome()
+    return 'built'
+
+
+def _start_response(status, headers, exc_info=None):
+    pass
+
+
+def _warm_url(handler, url, host):
+    # The request goes through the full middleware stack, as a real one
+    # would; RequestFactory only builds its WSGI environ
+    environ = RequestFactory().get(url, HTTP_HOST=host).environ
+    response = handler(environ, _start_response)
+    try:
+        status = str(response.status_code)
+        if response.has_header('X-Page-Cache'):
+            status += f" ({response['X-Page-Cache']})"
+        return status
+    finally:
+        response.close()
+
+
+def _timed(name, func):
+    started = time.perf_counter()
+    try:
+        status = func()
+        ok = status[0] not in '45'
+    except Exception as exc:  # report and carry on with the other keys
+        status, ok = f'error: {exc}', False
+    finally:
+        # Each worker thread has its own DB connection
+        connection.close()
+    return {
+        'key': name,
+        'status': status,
+        'ok': ok,
+        'ms': (time.perf_counter() - started) * 1000,
+    }
+
+
+def warm_caches(urls=None, workers=4, host=None):
+    """Warm every key in parallel threads; return one timing dict per key."""
+    host = host or default_host()
+    urls = WARM_URLS if urls is None else urls
+    # The chrome goes first: every page render reads it
+    results = [_timed('site_chrome', _warm_chrome)]
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_timed, url, lambda url=url: _warm_url(handler, url, host)) for url in urls]
+        results.extend(future.result() for future in futures)
+    return results
+
+
+def warm_in_background():
+    """Warm the caches from a daemon thread without delaying startup."""
+    def run():
+        results = warm_caches()
+        failed = [result['key'] for result in results if not result['ok']]
+        logger.info("Cache warm-up finished: %d keys, %d failed %s", len(results), len(failed), failed or '')
+
+    threading.Thread(target=run, name='cache-warmup', daemon=True).start()